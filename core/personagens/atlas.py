@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+from PIL import Image
+
+# ====== CONFIG ======
+ROOT_OUT = Path("output_cuts")     # recortes gerados pelo teste.py / teste/teste.py
+ATLAS_OUT = Path("output_atlas")   # onde salvar os atlas
+MAX_ATLAS_SIZE = 2048              # lado máximo de cada página (potência de 2)
+PADDING = 1                        # px entre frames (evita sangrar com filtro)
+# ====================
+
+
+def next_pow2(n: int) -> int:
+    p = 1
+    while p < n:
+        p *= 2
+    return p
+
+
+def load_frame(path: Path):
+    """
+    Abre o recorte e corta as bordas transparentes.
+    Retorna (imagem cortada ou None se vazia, (ox, oy), (w, h) original).
+    """
+    img = Image.open(path).convert("RGBA")
+    bbox = img.getchannel("A").getbbox()
+    if bbox is None:
+        return None, (0, 0), img.size
+    return img.crop(bbox), bbox[:2], img.size
+
+
+def shelf_pack(sizes, width: int, height: int, padding: int = PADDING):
+    """
+    Empacota retângulos (w, h) em prateleiras numa página width x height,
+    do mais alto para o mais baixo. Retorna {índice: (x, y)} com os que
+    couberem; os que não couberem ficam de fora.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placed = {}
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if w > width or h > height:
+            continue
+        if x + w > width:
+            y += shelf_h + padding
+            x = shelf_h = 0
+        if y + h > height:
+            # prateleira cheia; ainda pode caber um mais baixo em outra
+            continue
+        placed[i] = (x, y)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+    return placed
+
+
+def pack_pages(sizes, max_size: int = MAX_ATLAS_SIZE, padding: int = PADDING):
+    """
+    Distribui os retângulos em páginas potência de 2 de até max_size.
+    Para cada página tenta do menor tamanho que comporta a área restante,
+    dobrando a largura e a altura alternadamente.
+    Retorna [((w, h), {índice: (x, y)})].
+    """
+    pending = list(range(len(sizes)))
+    pages = []
+    while pending:
+        sub = [sizes[i] for i in pending]
+        area = sum((w + padding) * (h + padding) for w, h in sub)
+        width = next_pow2(max(w for w, _ in sub))
+        height = next_pow2(max(h for _, h in sub))
+        if width > max_size or height > max_size:
+            raise ValueError(f"frame maior que o atlas ({max_size}px): {max(sub)}")
+        while width * height < area and (width < max_size or height < max_size):
+            if width <= height and width < max_size:
+                width *= 2
+            else:
+                height *= 2
+        while True:
+            placed = shelf_pack(sub, width, height, padding)
+            if len(placed) == len(sub) or (width >= max_size and height >= max_size):
+                break
+            if width <= height and width < max_size:
+                width *= 2
+            else:
+                height *= 2
+        if not placed:
+            raise ValueError(f"nenhum frame coube numa página de {width}x{height}")
+        pages.append(((width, height), {pending[i]: pos for i, pos in placed.items()}))
+        pending = [i for i in pending if i not in pages[-1][1]]
+    return pages
+
+
+def group_sheets(root: Path, group: str):
+    """
+    {nome do grupo: [(nome do frame, caminho)]}. Cada pasta com session_*.png
+    é uma folha; group="parent" junta as folhas da mesma pasta pai num atlas.
+    """
+    groups = {}
+    for path in sorted(root.rglob("session_*.png")):
+        if path.stem.endswith("_orig"):
+            continue
+        sheet = path.parent.relative_to(root)
+        key = sheet if group == "sheet" else sheet.parent
+        name = key.as_posix() if key.parts else root.resolve().name
+        groups.setdefault(name, []).append((f"{sheet.as_posix()}/{path.stem}", path))
+    return groups
+
+
+def atlas_stem(name: str) -> str:
+    # nome dos arquivos do atlas; main() recusa grupos com o mesmo stem
+    return name.replace("/", "_")
+
+
+def build_atlas(name: str, frames, out_dir: Path, max_size: int, padding: int):
+    """
+    Empacota os frames do grupo e grava <stem>_NN.png + <stem>.json,
+    apagando páginas <stem>_NN.png que sobraram de uma execução maior.
+    Frames idênticos (depois do corte) ocupam um só lugar no atlas.
+    Retorna (frames, páginas).
+    """
+    images = []
+    unique = {}
+    entries = {}
+    for frame_name, path in frames:
+        img, (ox, oy), (sw, sh) = load_frame(path)
+        entry = {
+            "spriteSourceSize": {"x": ox, "y": oy, "w": 0, "h": 0},
+            "sourceSize": {"w": sw, "h": sh},
+        }
+        entries[frame_name] = entry
+        if img is None:
+            entry["page"] = None
+            entry["frame"] = {"x": 0, "y": 0, "w": 0, "h": 0}
+            continue
+        entry["spriteSourceSize"].update(w=img.width, h=img.height)
+        key = hashlib.sha1(img.tobytes()).hexdigest() + f":{img.width}x{img.height}"
+        if key not in unique:
+            unique[key] = len(images)
+            images.append(img)
+        entry["slot"] = unique[key]
+
+    pages = pack_pages([img.size for img in images], max_size, padding) if images else []
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = atlas_stem(name)
+    slot_pos = {}
+    page_files = []
+    for page_no, ((w, h), placed) in enumerate(pages):
+        atlas = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+        for slot, (x, y) in placed.items():
+            atlas.paste(images[slot], (x, y))
+            slot_pos[slot] = (page_no, x, y)
+        page_file = f"{stem}_{page_no:02d}.png"
+        atlas.save(out_dir / page_file, optimize=True)
+        page_files.append({"image": page_file, "w": w, "h": h})
+
+    written = {page["image"] for page in page_files}
+    page_re = re.compile(re.escape(stem) + r"_\d+\.png")
+    for path in out_dir.iterdir():
+        if page_re.fullmatch(path.name) and path.name not in written:
+            path.unlink()
+
+    for entry in entries.values():
+        slot = entry.pop("slot", None)
+        if slot is None:
+            continue
+        page_no, x, y = slot_pos[slot]
+        img = images[slot]
+        entry["page"] = page_no
+        entry["frame"] = {"x": x, "y": y, "w": img.width, "h": img.height}
+        entry["trimmed"] = (img.width, img.height) != (entry["sourceSize"]["w"], entry["sourceSize"]["h"])
+
+    index = {"pages": page_files, "frames": entries}
+    (out_dir / f"{stem}.json").write_text(json.dumps(index, indent=1), encoding="utf-8")
+    return len(entries), len(page_files)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Empacota os recortes em atlas potência de 2.")
+    parser.add_argument("--input", type=Path, default=ROOT_OUT, help=f"pasta dos recortes (padrão: {ROOT_OUT})")
+    parser.add_argument("--output", type=Path, default=ATLAS_OUT, help=f"pasta dos atlas (padrão: {ATLAS_OUT})")
+    parser.add_argument(
+        "--group",
+        choices=("sheet", "parent"),
+        default="sheet",
+        help="um atlas por folha (padrão) ou por pasta pai (ex.: todos os lideres juntos)",
+    )
+    parser.add_argument("--max-size", type=int, default=MAX_ATLAS_SIZE, help="lado máximo da página (potência de 2)")
+    parser.add_argument("--padding", type=int, default=PADDING, help="px entre frames")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    groups = group_sheets(args.input, args.group)
+    if not groups:
+        print(f"Nenhum session_*.png encontrado em: {args.input.resolve()}")
+        return
+
+    by_stem = {}
+    for name in groups:
+        by_stem.setdefault(atlas_stem(name), []).append(name)
+
+    total_frames = 0
+    total_pages = 0
+    for name, frames in groups.items():
+        clash = by_stem[atlas_stem(name)]
+        if len(clash) > 1:
+            others = ", ".join(other for other in clash if other != name)
+            print(f"ERRO: {name} -> mesmo arquivo de atlas que {others} ({atlas_stem(name)})")
+            continue
+        try:
+            count, pages = build_atlas(name, frames, args.output, args.max_size, args.padding)
+        except Exception as e:
+            print(f"ERRO: {name} -> {e}")
+            continue
+        total_frames += count
+        total_pages += pages
+        print(f"OK: {name} ({count} frames, {pages} página(s))")
+
+    print("\n===== RESUMO =====")
+    print(f"Atlas:                {len(groups)}")
+    print(f"Frames:               {total_frames}")
+    print(f"Páginas:              {total_pages}")
+    print(f"Saída em:             {args.output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
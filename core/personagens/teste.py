@@ -1,4 +1,8 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import numpy as np
 from PIL import Image
 
 # ====== CONFIG ======
@@ -10,49 +14,25 @@ NONWHITE_TOL = 2       # 2~10 se houver ruído/compressão
 # ====================
 
 
-def is_white(px):
-    r, g, b = px[:3]
-    return r >= WHITE_THRESHOLD and g >= WHITE_THRESHOLD and b >= WHITE_THRESHOLD
+def white_mask(rgb: np.ndarray) -> np.ndarray:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (r >= WHITE_THRESHOLD) & (g >= WHITE_THRESHOLD) & (b >= WHITE_THRESHOLD)
 
 
 def find_vertical_slices(img_rgba: Image.Image):
-    w, h = img_rgba.size
-    pix = img_rgba.load()
+    w = img_rgba.width
+    rgb = np.asarray(img_rgba)[:, :, :3]
 
     # coluna separadora = quase toda branca
-    is_sep_col = [False] * w
-    for x in range(w):
-        nonwhite = 0
-        for y in range(h):
-            if not is_white(pix[x, y]):
-                nonwhite += 1
-                if nonwhite > NONWHITE_TOL:
-                    break
-        if nonwhite <= NONWHITE_TOL:
-            is_sep_col[x] = True
-
-    # bounds entre separadores
-    bounds = []
-    x = 0
-    while x < w and is_sep_col[x]:
-        x += 1
-    start = x
-
-    while x < w:
-        if is_sep_col[x]:
-            end = x
-            if end - start > 1:
-                bounds.append((start, end))
-            while x < w and is_sep_col[x]:
-                x += 1
-            start = x
-        else:
-            x += 1
-
-    if start < w:
-        bounds.append((start, w))
-
-    return bounds
+    nonwhite = np.count_nonzero(~white_mask(rgb), axis=0)
+    is_sep_col = nonwhite <= NONWHITE_TOL
+
+    # bounds entre separadores: trechos de colunas não separadoras; o último
+    # trecho (até a borda) entra sempre, os do meio só com mais de 1 coluna
+    edges = np.diff(np.concatenate(([0], (~is_sep_col).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(int(x0), int(x1)) for x0, x1 in zip(starts, ends) if x1 == w or x1 - x0 > 1]
 
 
 def process_one_file(jpg_path: Path):
@@ -75,7 +55,40 @@ def process_one_file(jpg_path: Path):
     return saved, f"OK ({saved}): {jpg_path} -> {out_dir}"
 
 
+def iter_results(files, workers):
+    # (arquivo, resultado, erro) na ordem em que terminam; workers=1 roda
+    # em série, como antes
+    if workers <= 1:
+        for f in files:
+            try:
+                yield f, process_one_file(f), None
+            except Exception as e:
+                yield f, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_one_file, f): f for f in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Corta as folhas de sprites em sessões.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processos em paralelo (padrão: 1, em série; 0 = todos os núcleos)",
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    workers = args.workers if args.workers >= 1 else (os.cpu_count() or 1)
     ROOT_OUT.mkdir(exist_ok=True)
 
     jpg_files = list(ROOT_IN.rglob("*.jpg")) + list(ROOT_IN.rglob("*.JPG")) + list(ROOT_IN.rglob("*.jpeg")) + list(ROOT_IN.rglob("*.JPEG"))
@@ -86,14 +99,14 @@ def main():
     total_files = 0
     total_slices = 0
 
-    for f in jpg_files:
+    for f, result, error in iter_results(jpg_files, workers):
         total_files += 1
-        try:
-            saved, msg = process_one_file(f)
-            total_slices += saved
-            print(msg)
-        except Exception as e:
-            print(f"ERRO: {f} -> {e}")
+        if error is not None:
+            print(f"ERRO: {f} -> {error}", flush=True)
+            continue
+        saved, msg = result
+        total_slices += saved
+        print(msg, flush=True)
 
     print("\n===== RESUMO =====")
     print(f"Arquivos processados: {total_files}")
@@ -1,6 +1,14 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+import numpy as np
 from PIL import Image
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
+import io
+import json
+import threading
 import time
 import os
 
@@ -9,90 +17,338 @@ ROOT_IN = Path(r".")                 # raiz onde procurar .jpg/.jpeg
 ROOT_OUT = Path("output_cuts")       # onde salvar os recortes
 WHITE_THRESHOLD = 200                # 235~252
 NONWHITE_TOL = 2                     # 2~10 se houver ruído
-REMOVE_BG_ENDPOINT = "https://api.remove.bg/v1.0/removebg"
-SLEEP_BETWEEN_CALLS = 0.4            # evita estourar rate limit
+REMOVE_BG_ENDPOINT = os.getenv("REMOVE_BG_ENDPOINT", "https://api.remove.bg/v1.0/removebg")
+REMOVE_BG_PARAMS = {"size": "auto"}  # vai no POST e na chave do cache
+UPLOAD_CONCURRENCY = 4               # envios simultâneos por processo
+RATE_LIMIT = 2.5                     # envios/s no total (token bucket)
+RATE_BURST = 4                       # envios seguidos antes de limitar
+MAX_RETRIES = 5                      # novas tentativas em 429/5xx/erro de rede
+BACKOFF_BASE = 1.0                   # segundos, dobra a cada tentativa
+BACKOFF_MAX = 30.0                   # segundos
 TIMEOUT = 60                         # segundos
+BG_MODE = "api"                      # "api" (remove.bg) ou "local" (--bg)
+LOCAL_BG_THRESHOLD = WHITE_THRESHOLD # fundo local: quase branco ligado à borda
+LOCAL_FEATHER = 0                    # px de borda suavizada no modo local (--feather)
+# resultados já processados, por hash do recorte; fora de ROOT_IN para o
+# rglob não pegar os .png do cache
+CACHE_DIR = Path(os.getenv("REMOVE_BG_CACHE", Path.home() / ".cache" / "remove_bg"))
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # acima disso apaga os menos usados
 # ==========================
 
 API_KEY = os.getenv("REMOVE_BG_API_KEY")
-if not API_KEY:
-    raise SystemExit(
-        "Defina a variável de ambiente REMOVE_BG_API_KEY antes de rodar.\n"
-        "PowerShell: $env:REMOVE_BG_API_KEY='SUA_CHAVE_AQUI'"
-    )
 
-def is_white(px):
-    r, g, b = px[:3]
-    return r >= WHITE_THRESHOLD and g >= WHITE_THRESHOLD and b >= WHITE_THRESHOLD
+def white_mask(rgb: np.ndarray, threshold: int = WHITE_THRESHOLD) -> np.ndarray:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (r >= threshold) & (g >= threshold) & (b >= threshold)
 
 def find_vertical_slices(img_rgba: Image.Image):
-    w, h = img_rgba.size
-    pix = img_rgba.load()
+    w = img_rgba.width
+    rgb = np.asarray(img_rgba)[:, :, :3]
 
     # coluna separadora = quase toda branca
-    is_sep_col = [False] * w
-    for x in range(w):
-        nonwhite = 0
-        for y in range(h):
-            if not is_white(pix[x, y]):
-                nonwhite += 1
-                if nonwhite > NONWHITE_TOL:
-                    break
-        if nonwhite <= NONWHITE_TOL:
-            is_sep_col[x] = True
-
-    bounds = []
-    x = 0
-    while x < w and is_sep_col[x]:
-        x += 1
-    start = x
-
-    while x < w:
-        if is_sep_col[x]:
-            end = x
-            if end - start > 1:
-                bounds.append((start, end))
-            while x < w and is_sep_col[x]:
-                x += 1
-            start = x
-        else:
-            x += 1
+    nonwhite = np.count_nonzero(~white_mask(rgb), axis=0)
+    is_sep_col = nonwhite <= NONWHITE_TOL
+
+    # trechos de colunas não separadoras; o último (até a borda) entra sempre,
+    # os do meio só com mais de 1 coluna
+    edges = np.diff(np.concatenate(([0], (~is_sep_col).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return [(int(x0), int(x1)) for x0, x1 in zip(starts, ends) if x1 == w or x1 - x0 > 1]
+
+class TokenBucket:
+    """
+    Libera até `rate` envios por segundo, com rajadas de até `burst`.
+    acquire() bloqueia até haver uma ficha; seguro entre threads.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# um bucket e uma sessão por processo; com --workers N cada processo fica
+# com 1/N do RATE_LIMIT (ver init_worker)
+_rate_share = 1
+_bucket = None
+_session = None
+_client_lock = threading.Lock()
+
+def init_worker(workers: int, bg_mode: str = BG_MODE, feather: int = LOCAL_FEATHER):
+    global _rate_share, BG_MODE, LOCAL_FEATHER
+    _rate_share = max(1, workers)
+    BG_MODE = bg_mode
+    LOCAL_FEATHER = feather
+
+def get_bucket() -> TokenBucket:
+    global _bucket
+    with _client_lock:
+        if _bucket is None:
+            _bucket = TokenBucket(RATE_LIMIT / _rate_share, max(1, RATE_BURST // _rate_share))
+        return _bucket
+
+def get_session() -> requests.Session:
+    # conexões reaproveitadas (keep-alive) em vez de uma nova por envio
+    global _session
+    with _client_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=UPLOAD_CONCURRENCY)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["X-Api-Key"] = API_KEY
+        return _session
+
+def backoff_delay(attempt: int, resp=None) -> float:
+    # respeita Retry-After (em segundos) quando o servidor manda
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(BACKOFF_MAX, float(retry_after))
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+
+def post_with_retries(image_bytes: bytes, filename: str):
+    """
+    POST no REMOVE_BG_ENDPOINT passando pelo token bucket; tenta de novo com
+    backoff exponencial em 429, 5xx e erros de rede; outros erros do
+    requests voltam na hora como mensagem.
+    Retorna (resposta, None) ou (None, mensagem de erro).
+    """
+    session = get_session()
+    bucket = get_bucket()
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            resp = session.post(
+                REMOVE_BG_ENDPOINT,
+                files={"image_file": (filename, image_bytes)},
+                data=REMOVE_BG_PARAMS,
+                timeout=TIMEOUT,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                return None, f"{type(e).__name__}: {e}"
+            time.sleep(backoff_delay(attempt))
+            continue
+        except requests.RequestException as e:
+            # URL inválida, redirecionamentos demais...: tentar de novo não
+            # adianta, e deixar escapar derrubaria o lote inteiro
+            return None, f"{type(e).__name__}: {e}"
+        if resp.status_code == 429 or resp.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                return resp, None
+            time.sleep(backoff_delay(attempt, resp))
+            continue
+        return resp, None
+
+def run_labels(mask: np.ndarray) -> np.ndarray:
+    # id (1..n) do trecho contíguo de True em cada linha; 0 fora da máscara
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    return np.cumsum(starts.ravel()).reshape(mask.shape) * mask
+
+def border_flood(candidates: np.ndarray) -> np.ndarray:
+    """
+    Pixels de `candidates` ligados à borda da imagem (vizinhança de 4).
+    Em vez de crescer um pixel por passo, cada passo preenche trechos
+    inteiros de linha e depois de coluna que já tocam o preenchido; só
+    precisa de um passo por curva do caminho até a borda.
+    """
+    row_ids = run_labels(candidates)
+    col_ids = run_labels(np.ascontiguousarray(candidates.T)).T
+    filled = np.zeros_like(candidates)
+    filled[[0, -1], :] = candidates[[0, -1], :]
+    filled[:, [0, -1]] = candidates[:, [0, -1]]
+    while True:
+        grown = filled
+        for ids in (row_ids, col_ids):
+            hit = np.zeros(int(ids.max()) + 1, dtype=bool)
+            hit[ids[grown]] = True
+            hit[0] = False
+            grown = hit[ids]
+        if np.array_equal(grown, filled):
+            return filled
+        filled = grown
+
+def feather_alpha(background: np.ndarray, feather: int) -> np.ndarray:
+    # alpha 0 no fundo, subindo até 255 nos `feather` px do sprite mais
+    # próximos dele (distância de xadrez)
+    alpha = np.full(background.shape, 255, dtype=np.uint8)
+    near = background.copy()
+    alpha[near] = 0
+    for d in range(1, feather + 1):
+        grown = near.copy()
+        grown[1:] |= near[:-1]
+        grown[:-1] |= near[1:]
+        grown[:, 1:] |= grown[:, :-1].copy()
+        grown[:, :-1] |= grown[:, 1:].copy()
+        ring = grown & ~near
+        alpha[ring] = round(255 * d / (feather + 1))
+        near = grown
+    return alpha
+
+def remove_bg_local(image_bytes: bytes, threshold: int = LOCAL_BG_THRESHOLD, feather: int = 0) -> bytes:
+    """
+    Remoção de fundo offline para pixel art em fundo quase branco: deixa
+    transparente o quase branco (ou já transparente) ligado à borda. Branco
+    cercado pelo sprite (olhos, brilhos) fica. Retorna o PNG RGBA.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as im:
+        rgba = np.array(im.convert("RGBA"))
+    candidates = white_mask(rgba[..., :3], threshold) | (rgba[..., 3] == 0)
+    background = border_flood(candidates)
+    alpha = feather_alpha(background, feather) if feather > 0 else np.where(background, 0, 255)
+    rgba[..., 3] = np.minimum(rgba[..., 3], alpha)
+    rgba[background] = 0
+    out = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(out, format="PNG")
+    return out.getvalue()
+
+class ResultCache:
+    """
+    Cache em disco dos resultados do remove.bg, endereçado pelo conteúdo:
+    chave = sha256 dos bytes do recorte + REMOVE_BG_PARAMS, arquivo em
+    <dir>/<2 hex>/<2 hex>/<chave>.png. O mtime marca o último uso; ao passar
+    de max_bytes apaga os mais antigos (LRU). Seguro entre threads; entre
+    processos as escritas são atômicas e o tamanho é só estimado.
+    """
 
-    if start < w:
-        bounds.append((start, w))
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total = None
 
-    return bounds
+    def key(self, image_bytes: bytes) -> str:
+        h = hashlib.sha256(image_bytes)
+        h.update(json.dumps(REMOVE_BG_PARAMS, sort_keys=True).encode("ascii"))
+        return h.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / f"{key}.png"
+
+    def get(self, key: str):
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self.lock:
+            if self.total is None:
+                self.total = sum(f.stat().st_size for f in self.entries())
+            else:
+                self.total += len(data)
+            if self.total > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        return self.root.glob("??/??/*.png")
+
+    def evict(self):
+        # recontado do disco: outros processos também gravam aqui
+        files = []
+        for f in self.entries():
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, f))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, f in files:
+            if total <= self.max_bytes:
+                break
+            f.unlink(missing_ok=True)
+            total -= size
+        self.total = total
+
+_cache = None
+
+def get_cache() -> ResultCache:
+    global _cache
+    with _client_lock:
+        if _cache is None:
+            _cache = ResultCache(CACHE_DIR, CACHE_MAX_BYTES)
+        return _cache
 
 def remove_bg_inplace(png_path: Path):
     """
     Envia a imagem ao remove.bg e sobrescreve o arquivo com a versão sem fundo.
-    Mantém backup em *_orig.png
+    Mantém backup em *_orig.png. Recortes iguais a um já processado (em
+    qualquer folha ou execução) vêm do cache, sem gastar créditos. Com
+    BG_MODE "local", ou se o remove.bg falhar, usa remove_bg_local.
+    Retorna (ok, msg, origem), origem = "skip", "cache", "api", "local" ou
+    "fallback" (remove.bg falhou, fundo removido localmente).
     """
     backup = png_path.with_name(png_path.stem + "_orig.png")
 
     # se já tem backup, assume que já processou (evita gastar créditos)
     if backup.exists():
-        return True, f"SKIP (já processado): {png_path.name}"
+        return True, f"SKIP (já processado): {png_path.name}", "skip"
 
     # faz backup
     png_path.replace(backup)
 
-    with open(backup, "rb") as f:
-        resp = requests.post(
-            REMOVE_BG_ENDPOINT,
-            files={"image_file": f},
-            data={"size": "auto"},
-            headers={"X-Api-Key": API_KEY},
-            timeout=TIMEOUT,
-        )
+    image_bytes = backup.read_bytes()
+    if BG_MODE == "local":
+        png_path.write_bytes(remove_bg_local(image_bytes, feather=LOCAL_FEATHER))
+        return True, f"OK local: {png_path.name}", "local"
+
+    cache = get_cache()
+    key = cache.key(image_bytes)
+    cached = cache.get(key)
+    if cached is not None:
+        png_path.write_bytes(cached)
+        return True, f"OK cache: {png_path.name}", "cache"
+
+    resp, error = post_with_retries(image_bytes, backup.name)
 
-    if resp.status_code == requests.codes.ok:
+    if resp is not None and resp.status_code == requests.codes.ok:
         png_path.write_bytes(resp.content)
-        return True, f"OK remove.bg: {png_path.name}"
-    else:
+        cache.put(key, resp.content)
+        return True, f"OK remove.bg: {png_path.name}", "api"
+
+    reason = error if resp is None else f"{resp.status_code}: {resp.text[:200]}"
+    try:
+        png_path.write_bytes(remove_bg_local(image_bytes, feather=LOCAL_FEATHER))
+    except Exception as e:
         # restaura original se falhar
         backup.replace(png_path)
-        return False, f"ERRO remove.bg ({resp.status_code}): {resp.text[:200]}"
+        return False, f"ERRO remove.bg ({reason}) e local ({e}): {png_path.name}", "api"
+    return True, f"OK local (remove.bg falhou: {reason}): {png_path.name}", "fallback"
+
+def remove_bg_batch(paths):
+    """
+    remove_bg_inplace em até UPLOAD_CONCURRENCY envios ao mesmo tempo.
+    Retorna [(ok, msg, origem)] na ordem de `paths`.
+    """
+    if len(paths) <= 1 or UPLOAD_CONCURRENCY <= 1:
+        return [remove_bg_inplace(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as pool:
+        return list(pool.map(remove_bg_inplace, paths))
 
 def process_one_jpg(jpg_path: Path):
     rel = jpg_path.relative_to(ROOT_IN)
@@ -103,7 +359,7 @@ def process_one_jpg(jpg_path: Path):
     bounds = find_vertical_slices(img)
 
     if not bounds:
-        return 0, 0, f"SEM CORTES: {jpg_path}"
+        return 0, 0, 0, 0, 0, f"SEM CORTES: {jpg_path}"
 
     # 1) cortar
     session_paths = []
@@ -114,20 +370,83 @@ def process_one_jpg(jpg_path: Path):
         session_paths.append(out_path)
 
     # 2) enviar cada session para remove.bg e sobrescrever
+    # (as linhas voltam junto com o resultado para não se misturarem entre
+    # processos com --workers)
     ok_count = 0
     fail_count = 0
-    for p in session_paths:
-        ok, msg = remove_bg_inplace(p)
-        print("   ", msg)
-        if ok:
-            ok_count += 1
-        else:
+    cache_hits = 0
+    cache_misses = 0
+    local_count = 0
+    lines = []
+    for ok, msg, source in remove_bg_batch(session_paths):
+        lines.append(f"    {msg}")
+        # "remove.bg OK" só conta o que veio do remove.bg (ou do cache dele);
+        # o modo local e o fallback vão para local_count
+        if not ok:
             fail_count += 1
-        time.sleep(SLEEP_BETWEEN_CALLS)
+        elif source in ("local", "fallback"):
+            local_count += 1
+        else:
+            ok_count += 1
+        if source == "cache":
+            cache_hits += 1
+        elif source in ("api", "fallback"):
+            cache_misses += 1
+
+    lines.append(f"OK: {jpg_path} -> {out_dir} (sessions={len(session_paths)}, removed_bg_ok={ok_count}, local={local_count}, fail={fail_count})")
+    return len(session_paths), ok_count, cache_hits, cache_misses, local_count, "\n".join(lines)
+
+def iter_results(files, workers, initargs):
+    # (arquivo, resultado, erro) na ordem em que terminam; workers=1 roda
+    # em série, como antes
+    if workers <= 1:
+        for f in files:
+            try:
+                yield f, process_one_jpg(f), None
+            except Exception as e:
+                yield f, None, e
+        return
 
-    return len(session_paths), ok_count, f"OK: {jpg_path} -> {out_dir} (sessions={len(session_paths)}, removed_bg_ok={ok_count}, fail={fail_count})"
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+        futures = {pool.submit(process_one_jpg, f): f for f in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Corta as folhas de sprites e remove o fundo.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processos em paralelo (padrão: 1, em série; 0 = todos os núcleos)",
+    )
+    parser.add_argument(
+        "--bg",
+        choices=("api", "local"),
+        default=BG_MODE,
+        help="remoção de fundo: api (remove.bg, com o modo local se falhar) ou local (offline)",
+    )
+    parser.add_argument(
+        "--feather",
+        type=int,
+        default=LOCAL_FEATHER,
+        help="px de borda suavizada no fundo removido localmente (padrão: 0, borda dura)",
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    workers = args.workers if args.workers >= 1 else (os.cpu_count() or 1)
+    if args.bg == "api" and not API_KEY:
+        raise SystemExit(
+            "Defina a variável de ambiente REMOVE_BG_API_KEY antes de rodar (ou use --bg local).\n"
+            "PowerShell: $env:REMOVE_BG_API_KEY='SUA_CHAVE_AQUI'"
+        )
+    initargs = (workers, args.bg, max(0, args.feather))
+    init_worker(*initargs)
     ROOT_OUT.mkdir(exist_ok=True)
 
     jpg_files = []
@@ -141,21 +460,29 @@ def main():
     total_files = 0
     total_sessions = 0
     total_removed_ok = 0
+    total_cache_hits = 0
+    total_cache_misses = 0
+    total_local = 0
 
-    for f in jpg_files:
+    for f, result, error in iter_results(jpg_files, workers, initargs):
         total_files += 1
-        try:
-            sessions, removed_ok, msg = process_one_jpg(f)
-            total_sessions += sessions
-            total_removed_ok += removed_ok
-            print(msg)
-        except Exception as e:
-            print(f"ERRO: {f} -> {e}")
+        if error is not None:
+            print(f"ERRO: {f} -> {error}", flush=True)
+            continue
+        sessions, removed_ok, cache_hits, cache_misses, local_count, msg = result
+        total_sessions += sessions
+        total_removed_ok += removed_ok
+        total_cache_hits += cache_hits
+        total_cache_misses += cache_misses
+        total_local += local_count
+        print(msg, flush=True)
 
     print("\n===== RESUMO =====")
     print(f"Arquivos .jpg processados: {total_files}")
     print(f"Sessões geradas:           {total_sessions}")
     print(f"remove.bg OK:              {total_removed_ok}")
+    print(f"Cache hits / misses:       {total_cache_hits} / {total_cache_misses}")
+    print(f"Fundo removido localmente: {total_local}")
     print(f"Saída em:                  {ROOT_OUT.resolve()}")
 
 if __name__ == "__main__":
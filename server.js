@@ -68,6 +68,70 @@ app.get("/core/index.html", requireAuth, requireAdmin, (req, res) => {
   res.sendFile(path.join(__dirname, "core", "index.html"));
 });
 
+// Mapas pré-comprimidos (tools/sync-world.py --precompress gz,br): entrega o
+// .json.br/.json.gz ao lado do mapa se o cliente aceitar e ele não for mais
+// antigo que o .json (um mapa salvo pelo editor depois do sync cai no .json).
+const PRECOMPRESSED_MAPS = [
+  ["br", "br"],
+  ["gzip", "gz"],
+];
+
+// Accept-Encoding -> { codificação: q }; "*" vale para as não listadas e
+// q=0 recusa a codificação.
+function parseAcceptEncoding(header) {
+  const accepted = {};
+  for (const part of String(header || "").split(",")) {
+    const [token, ...params] = part.split(";").map((s) => s.trim());
+    if (!token) continue;
+    let q = 1;
+    for (const param of params) {
+      const match = /^q\s*=\s*([0-9.]+)$/i.exec(param);
+      if (match) q = Number(match[1]);
+    }
+    accepted[token.toLowerCase()] = Number.isFinite(q) ? q : 0;
+  }
+  return accepted;
+}
+
+// Codificações pré-comprimidas aceitas, da maior q para a menor (empate
+// segue a ordem de PRECOMPRESSED_MAPS).
+function acceptedPrecompressed(header) {
+  const accepted = parseAcceptEncoding(header);
+  const qOf = (encoding) =>
+    encoding in accepted ? accepted[encoding] : "*" in accepted ? accepted["*"] : 0;
+  return PRECOMPRESSED_MAPS.filter(([encoding]) => qOf(encoding) > 0).sort(
+    ([a], [b]) => qOf(b) - qOf(a)
+  );
+}
+
+app.get(/^\/core\/mapas\/[^/]+\.json$/, (req, res, next) => {
+  const fs = require("fs");
+  const jsonPath = path.join(__dirname, "core", "mapas", path.basename(req.path));
+  let jsonStat;
+  try {
+    jsonStat = fs.statSync(jsonPath);
+  } catch (e) {
+    return next();
+  }
+  for (const [encoding, ext] of acceptedPrecompressed(req.headers["accept-encoding"])) {
+    const filePath = jsonPath + "." + ext;
+    let stat;
+    try {
+      stat = fs.statSync(filePath);
+    } catch (e) {
+      continue;
+    }
+    if (stat.mtimeMs < jsonStat.mtimeMs) continue;
+    res.set({
+      "Content-Type": "application/json; charset=utf-8",
+      "Content-Encoding": encoding,
+      Vary: "Accept-Encoding",
+    });
+    return res.sendFile(filePath);
+  }
+  next();
+});
+
 // Assets do core (mapas, sprites, engine)
 app.use("/core", express.static(path.join(__dirname, "core"), { index: false }));
 
@@ -0,0 +1,122 @@
+"""
+Testes para o índice de regras de portal-locks (tools/portal_locks.py)
+
+Execute com: python tests/portal_locks_test.py (ou python -m pytest tests)
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+import portal_locks  # noqa: E402
+
+MAPS = ["A", "B", "C", "D"]
+
+
+def brute_force_candidates(rules, kind, from_map, to_map, direction):
+    # Linear scan with the documented precedence: more fields set wins, then
+    # the field order of KEY_FIELDS, then file order; one rule per key.
+    values = {"fromMap": from_map, "toMap": to_map, "direction": direction, "kind": kind}
+    found = []
+    seen = set()
+    for position, rule in enumerate(rules):
+        key = portal_locks.rule_key(rule)
+        if key in seen:
+            continue
+        seen.add(key)
+        if all(
+            value is None or value == values[field]
+            for field, value in zip(portal_locks.KEY_FIELDS, key)
+        ):
+            found.append((position, rule))
+
+    def precedence(hit):
+        mask = portal_locks.rule_pattern(portal_locks.rule_key(hit[1]))
+        return (-sum(mask), [not concrete for concrete in mask], hit[0])
+
+    return sorted(found, key=precedence)
+
+
+def random_rule(rng):
+    rule = {"flag": "FLAG_%d" % rng.randrange(100)}
+    for field, choices in (
+        ("fromMap", MAPS),
+        ("toMap", MAPS),
+        ("direction", portal_locks.DIRECTIONS),
+        ("kind", portal_locks.LOCK_KINDS),
+    ):
+        roll = rng.random()
+        if roll < 0.4:
+            rule[field] = rng.choice(choices)
+        elif roll < 0.5:
+            rule[field] = ""
+    return rule
+
+
+def random_query(rng):
+    to_map = rng.choice(MAPS + [None])
+    if rng.random() < 0.5:
+        return ("warp", rng.choice(MAPS), to_map, None)
+    return ("connection", rng.choice(MAPS), to_map, rng.choice(portal_locks.DIRECTIONS))
+
+
+def test_match_lock_matches_brute_force():
+    rng = random.Random(1234)
+    mismatches = 0
+    for _ in range(300):
+        rules = [random_rule(rng) for _ in range(rng.randrange(1, 25))]
+        compiled = portal_locks.compile_locks(rules)
+        for _ in range(50):
+            query = random_query(rng)
+            expected = brute_force_candidates(rules, *query)
+            if portal_locks.candidates(compiled, *query) != expected:
+                mismatches += 1
+            if portal_locks.match_lock(compiled, *query) is not (
+                expected[0][1] if expected else None
+            ):
+                mismatches += 1
+    assert mismatches == 0, "%d queries disagree with the brute-force matcher" % mismatches
+
+
+def test_warp_prefers_rule_setting_more_fields():
+    rules = [
+        {"fromMap": "A", "flag": "FLAG_FROM"},
+        {"toMap": "B", "kind": "warp", "flag": "FLAG_TO_WARP"},
+    ]
+    compiled = portal_locks.compile_locks(rules)
+    assert portal_locks.match_lock(compiled, "warp", "A", "B", None) is rules[1]
+    assert portal_locks.candidates(compiled, "warp", "A", "B", None) == [
+        (1, rules[1]),
+        (0, rules[0]),
+    ]
+
+
+def test_direction_rule_never_matches_warps():
+    rules = [{"fromMap": "A", "direction": "up", "flag": "FLAG_UP"}]
+    compiled = portal_locks.compile_locks(rules)
+    assert portal_locks.match_lock(compiled, "warp", "A", "B", None) is None
+    assert portal_locks.match_lock(compiled, "connection", "A", "B", "up") is rules[0]
+
+
+def test_validate_locks_reports_overridden_rule():
+    rules = [
+        {"fromMap": "A", "flag": "FLAG_FROM"},
+        {"fromMap": "A", "toMap": "B", "flag": "FLAG_PAIR"},
+    ]
+    compiled = portal_locks.compile_locks(rules)
+    issues = portal_locks.validate_locks(
+        rules, compiled, {"A", "B"}, [("warp", "A", "B", None)]
+    )
+    assert issues == [
+        {"rule": 0, "issue": "overridden on every portal it matches by rule(s) 1"}
+    ]
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print("ok", name)
+    print("%d testes passaram" % len(tests))
@@ -0,0 +1,11 @@
+import sys
+
+import world_bench
+
+
+def main(argv=None):
+    return world_bench.main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+
+# Project root. WORLD_ROOT points every tool at another tree with the same
+# layout (core/mapas, core/pokefirered-master, data), e.g. a synthetic world.
+ROOT = os.path.abspath(
+    os.environ.get("WORLD_ROOT") or os.path.join(os.path.dirname(__file__), "..")
+)
+CACHE_DIR = os.path.join(ROOT, "tools", ".cache")
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path(tool_name):
+    return os.path.join(CACHE_DIR, "%s.manifest.json" % tool_name)
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, cache=None):
+    if not path:
+        return None
+    if cache is not None and path in cache:
+        return cache[path]
+    digest = None
+    if os.path.isfile(path):
+        with open(path, "rb") as handle:
+            digest = hash_bytes(handle.read())
+    if cache is not None:
+        cache[path] = digest
+    return digest
+
+
+def hash_value(value):
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
+    return hash_bytes(encoded.encode("ascii"))
+
+
+def combine_hashes(parts):
+    return hash_value([part or "" for part in parts])
+
+
+def write_atomic(path, payload):
+    # Readers never see a half-written file: write beside it, then rename.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(payload)
+    os.replace(tmp_path, path)
+
+
+def write_if_changed(path, payload):
+    # Leaves the file (and its mtime) alone when the bytes already match.
+    if os.path.isfile(path):
+        with open(path, "rb") as handle:
+            if handle.read() == payload:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, payload)
+    return True
+
+
+def tool_version(paths):
+    return combine_hashes([hash_file(path) for path in list(paths) + [__file__]])
+
+
+def new_manifest(version):
+    return {"version": MANIFEST_VERSION, "tool": version, "maps": {}}
+
+
+def load_manifest(tool_name, version):
+    empty = new_manifest(version)
+    path = manifest_path(tool_name)
+    if not os.path.isfile(path):
+        return empty
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except Exception:
+        return empty
+    if not isinstance(data, dict):
+        return empty
+    if data.get("version") != MANIFEST_VERSION or data.get("tool") != version:
+        return empty
+    if not isinstance(data.get("maps"), dict):
+        return empty
+    return data
+
+
+def save_manifest(tool_name, manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = manifest_path(tool_name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="ascii", newline="\n") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+        handle.write("\n")
+    os.replace(tmp_path, path)
+
+
+def is_fresh(manifest, map_id, inputs_hash, output_hash):
+    entry = manifest["maps"].get(map_id)
+    if not isinstance(entry, dict):
+        return False
+    return entry.get("inputs") == inputs_hash and entry.get("output") == output_hash
+
+
+def applied_passes(manifest, map_id):
+    # Passes that applied to the map when its entry was recorded; only their
+    # sidecar outputs have to exist for the entry to stay fresh.
+    entry = manifest["maps"].get(map_id)
+    if not isinstance(entry, dict) or not isinstance(entry.get("passes"), list):
+        return []
+    return entry["passes"]
+
+
+def record(manifest, map_id, inputs_hash, output_hash, passes):
+    manifest["maps"][map_id] = {"inputs": inputs_hash, "output": output_hash, "passes": passes}
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Stage times are seconds. "map_*" stages are summed over every compiled map,
+# so with --jobs they can add up to more than the wall time. "counts" holds
+# cache hit/miss and load counters, "slowest_maps" the maps that took longest
+# to compile as [map_id, seconds, status].
+STATS_VERSION = 2
+SLOWEST_MAPS = 10
+
+
+def new_stats():
+    return {"version": STATS_VERSION, "stages": {}, "counts": {}}
+
+
+def add_time(stages, name, seconds):
+    stages[name] = stages.get(name, 0.0) + seconds
+
+
+def merge_times(stages, other):
+    for name, seconds in other.items():
+        add_time(stages, name, seconds)
+
+
+def add_count(counts, name, amount=1):
+    counts[name] = counts.get(name, 0) + amount
+
+
+def merge_counts(counts, other):
+    for name, amount in other.items():
+        add_count(counts, name, amount)
+
+
+def slowest(map_times, limit):
+    # map_times: [(map_id, seconds, status)], longest first, ties by map id.
+    ranked = sorted(map_times, key=lambda item: (-item[1], item[0]))
+    return [list(item) for item in ranked[:limit]]
+
+
+@contextmanager
+def stage(stages, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(stages, name, time.perf_counter() - started)
+
+
+def peak_rss_kb():
+    # Largest resident set of this process or any finished worker, in KiB
+    # (None where the resource module is unavailable, e.g. Windows).
+    if resource is None:
+        return None
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+def write_stats(path, stats):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="ascii", newline="\n") as handle:
+        json.dump(stats, handle, indent=1, sort_keys=True)
+        handle.write("\n")
+
+
+def format_summary(stats):
+    lines = [
+        "Build stats: %d maps, %d updated, %d unchanged in %.2fs"
+        % (stats["maps"], stats["updated"], stats["unchanged"], stats["wall"])
+    ]
+    rss = stats.get("peak_rss_kb")
+    if rss:
+        lines[0] += ", peak RSS %.1f MB" % (rss / 1024.0)
+    for name, seconds in sorted(stats["stages"].items(), key=lambda item: -item[1]):
+        if seconds >= 0.001:
+            lines.append("  %-24s %8.3fs" % (name, seconds))
+    if stats["counts"]:
+        lines.append("  " + ", ".join("%s %d" % item for item in sorted(stats["counts"].items())))
+    if stats.get("slowest_maps"):
+        lines.append("  slowest maps:")
+        for map_id, seconds, status in stats["slowest_maps"]:
+            lines.append("    %-32s %8.3fs  %s" % (map_id, seconds, status))
+    return "\n".join(lines)
@@ -0,0 +1,36 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+_worker_context = None
+
+
+def resolve_jobs(jobs):
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def _run_in_worker(task):
+    func, item = task
+    return func(_worker_context, item)
+
+
+def run(func, context, items, jobs=1):
+    # Results always come back in input order, so callers can merge counters
+    # exactly as a serial run would.
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(context, item) for item in items]
+    workers = min(jobs, len(items))
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(context,)
+    ) as executor:
+        return list(
+            executor.map(_run_in_worker, [(func, item) for item in items], chunksize=chunksize)
+        )
@@ -0,0 +1,287 @@
+import numpy as np
+
+import pfr_tiles
+import world_compiler
+
+NAME = "colliders"
+SUMMARY = [("colliders:", "colliders"), ("skipped:", "skipped")]
+
+# Bits 10-11 of a block are its collision value; anything non-zero is solid.
+COLLISION_MASK = 0x0C00
+
+BLOCKED_BEHAVIOR_NAMES = [
+    "MB_IMPASSABLE_EAST",
+    "MB_IMPASSABLE_WEST",
+    "MB_IMPASSABLE_NORTH",
+    "MB_IMPASSABLE_SOUTH",
+    "MB_IMPASSABLE_NORTHEAST",
+    "MB_IMPASSABLE_NORTHWEST",
+    "MB_IMPASSABLE_SOUTHEAST",
+    "MB_IMPASSABLE_SOUTHWEST",
+    "MB_POND_WATER",
+    "MB_FAST_WATER",
+    "MB_DEEP_WATER",
+    "MB_WATERFALL",
+    "MB_OCEAN_WATER",
+    "MB_PUDDLE",
+    "MB_UNUSED_WATER",
+    "MB_CYCLING_ROAD_WATER",
+    "MB_SHALLOW_WATER",
+    "MB_UNDERWATER_BLOCKED_ABOVE",
+    "MB_MOUNTAIN_TOP",
+    "MB_COUNTER",
+    "MB_BOOKSHELF",
+    "MB_POKEMART_SHELF",
+    "MB_PC",
+    "MB_SIGNPOST",
+    "MB_REGION_MAP",
+    "MB_TELEVISION",
+    "MB_POKEMON_CENTER_SIGN",
+    "MB_POKEMART_SIGN",
+    "MB_CABINET",
+    "MB_KITCHEN",
+    "MB_DRESSER",
+    "MB_SNACKS",
+    "MB_CABLE_CLUB_WIRELESS_MONITOR",
+    "MB_BATTLE_RECORDS",
+    "MB_QUESTIONNAIRE",
+    "MB_FOOD",
+    "MB_INDIGO_PLATEAU_SIGN_1",
+    "MB_INDIGO_PLATEAU_SIGN_2",
+    "MB_BLUEPRINTS",
+    "MB_PAINTING",
+    "MB_POWER_PLANT_MACHINE",
+    "MB_TELEPHONE",
+    "MB_COMPUTER",
+    "MB_ADVERTISING_POSTER",
+    "MB_FOOD_SMELLS_TASTY",
+    "MB_TRASH_BIN",
+    "MB_CUP",
+    "MB_PORTHOLE",
+    "MB_WINDOW",
+    "MB_BLINKING_LIGHTS",
+    "MB_NEATLY_LINED_UP_TOOLS",
+    "MB_IMPRESSIVE_MACHINE",
+    "MB_VIDEO_GAME",
+    "MB_BURGLARY",
+    "MB_TRAINER_TOWER_MONITOR",
+]
+
+
+def blocked_lookup(behavior_values):
+    blocked = {}
+    for name in BLOCKED_BEHAVIOR_NAMES:
+        value = behavior_values.get(name)
+        if value is None:
+            print("Behavior not found:", name)
+            continue
+        blocked[value] = True
+    return pfr_tiles.behavior_lookup(blocked, dtype=bool)
+
+
+def blocked_grid(blocks, behaviors, lookup):
+    return ((blocks & COLLISION_MASK) != 0) | lookup[behaviors]
+
+
+def _run_length(cells):
+    # Number of leading True values.
+    if cells.all():
+        return len(cells)
+    return int(cells.argmin())
+
+
+def greedy_rects(grid):
+    # Row-first: each uncovered cell starts a rect that grows right, then down.
+    remaining = grid.copy()
+    rects = []
+    for y, x in zip(*np.nonzero(grid)):
+        if not remaining[y, x]:
+            continue
+        w = _run_length(remaining[y, x:])
+        h = _run_length(remaining[y:, x : x + w].all(axis=1))
+        remaining[y : y + h, x : x + w] = False
+        rects.append((int(x), int(y), w, h))
+    return rects
+
+
+def _reflex_vertices(grid):
+    # Grid points with exactly three blocked cells around them, keyed by
+    # (x, y) with the direction the interior continues along each axis.
+    height, width = grid.shape
+    padded = np.pad(grid, 1)
+    nw = padded[:-1, :-1]
+    ne = padded[:-1, 1:]
+    sw = padded[1:, :-1]
+    se = padded[1:, 1:]
+    count = nw.astype(np.int8) + ne + sw + se
+    reflex = {}
+    for y, x in zip(*np.nonzero(count == 3)):
+        if not nw[y, x]:
+            dirs = (1, 1)
+        elif not ne[y, x]:
+            dirs = (-1, 1)
+        elif not sw[y, x]:
+            dirs = (1, -1)
+        else:
+            dirs = (-1, -1)
+        reflex[(int(x), int(y))] = dirs
+    return reflex
+
+
+def _good_chords(grid, reflex):
+    # Axis-aligned chords through the interior that join two reflex vertices.
+    height, width = grid.shape
+    padded = np.pad(grid, 1)
+    h_inside = padded[:-1, 1:-1] & padded[1:, 1:-1]
+    v_inside = padded[1:-1, :-1] & padded[1:-1, 1:]
+    horizontal = []
+    vertical = []
+    for (x, y), (hdir, vdir) in sorted(reflex.items()):
+        if hdir == 1:
+            end = x
+            while end < width and h_inside[y, end]:
+                end += 1
+                if (end, y) in reflex:
+                    horizontal.append((y, x, end))
+                    break
+        if vdir == 1:
+            end = y
+            while end < height and v_inside[end, x]:
+                end += 1
+                if (x, end) in reflex:
+                    vertical.append((x, y, end))
+                    break
+    return horizontal, vertical
+
+
+def _independent_chords(horizontal, vertical):
+    # Maximum set of pairwise non-touching chords: the complement of a minimum
+    # vertex cover (Koenig) of the horizontal/vertical intersection graph.
+    edges = [
+        [
+            j
+            for j, (x, y0, y1) in enumerate(vertical)
+            if x0 <= x <= x1 and y0 <= y <= y1
+        ]
+        for y, x0, x1 in horizontal
+    ]
+    match_h = [None] * len(horizontal)
+    match_v = [None] * len(vertical)
+
+    def augment(i, seen):
+        for j in edges[i]:
+            if j in seen:
+                continue
+            seen.add(j)
+            if match_v[j] is None or augment(match_v[j], seen):
+                match_h[i] = j
+                match_v[j] = i
+                return True
+        return False
+
+    for i in range(len(horizontal)):
+        augment(i, set())
+
+    reach_h = set(i for i in range(len(horizontal)) if match_h[i] is None)
+    reach_v = set()
+    frontier = list(reach_h)
+    while frontier:
+        i = frontier.pop()
+        for j in edges[i]:
+            if j in reach_v:
+                continue
+            reach_v.add(j)
+            k = match_v[j]
+            if k is not None and k not in reach_h:
+                reach_h.add(k)
+                frontier.append(k)
+    chosen_h = [horizontal[i] for i in sorted(reach_h)]
+    chosen_v = [chord for j, chord in enumerate(vertical) if j not in reach_v]
+    return chosen_h, chosen_v
+
+
+def minimal_rects(grid):
+    # Minimum partition of a rectilinear region: cut along a maximum set of
+    # non-crossing chords between reflex vertices, then resolve every other
+    # reflex vertex with a horizontal cut to the nearest wall or vertical cut.
+    height, width = grid.shape
+    padded = np.pad(grid, 1)
+    h_inside = padded[:-1, 1:-1] & padded[1:, 1:-1]
+    reflex = _reflex_vertices(grid)
+    horizontal, vertical = _good_chords(grid, reflex)
+    chosen_h, chosen_v = _independent_chords(horizontal, vertical)
+
+    h_cut = np.zeros((height + 1, width), dtype=bool)
+    v_cut = np.zeros((height, width + 1), dtype=bool)
+    resolved = set()
+    for y, x0, x1 in chosen_h:
+        h_cut[y, x0:x1] = True
+        resolved.update([(x0, y), (x1, y)])
+    for x, y0, y1 in chosen_v:
+        v_cut[y0:y1, x] = True
+        resolved.update([(x, y0), (x, y1)])
+
+    for (x, y), (hdir, _) in sorted(reflex.items()):
+        if (x, y) in resolved:
+            continue
+        while True:
+            seg = x if hdir == 1 else x - 1
+            if seg < 0 or seg >= width or not h_inside[y, seg]:
+                break
+            h_cut[y, seg] = True
+            x += hdir
+            if (y > 0 and v_cut[y - 1, x]) or (y < height and v_cut[y, x]):
+                break
+
+    remaining = grid.copy()
+    rects = []
+    for y, x in zip(*np.nonzero(grid)):
+        if not remaining[y, x]:
+            continue
+        w = 1
+        while x + w < width and remaining[y, x + w] and not v_cut[y, x + w]:
+            w += 1
+        h = 1
+        while (
+            y + h < height
+            and remaining[y + h, x : x + w].all()
+            and not h_cut[y + h, x : x + w].any()
+        ):
+            h += 1
+        remaining[y : y + h, x : x + w] = False
+        rects.append((int(x), int(y), w, h))
+    return rects
+
+
+def decompose(grid):
+    # Exact disjoint cover of the blocked cells with as few rects as possible.
+    # Row-first greedy (what the PowerShell converter produced) goes first so
+    # maps where it is already optimal keep their current layout.
+    candidates = [greedy_rects(grid), minimal_rects(grid)]
+    return min(candidates, key=len)
+
+
+def prepare(index):
+    if not world_compiler.layout_sources_present():
+        return None
+    return {
+        "behaviors_hash": index["behaviors_hash"],
+        "blocked_lookup": blocked_lookup(index["behaviors"]),
+    }
+
+
+input_parts = world_compiler.behavior_input_parts
+input_paths = world_compiler.behavior_input_paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    blocks, behaviors = grid
+    rects = decompose(blocked_grid(blocks, behaviors, state["blocked_lookup"]))
+    data["colliders"] = [{"x": x, "y": y, "w": w, "h": h} for x, y, w, h in rects]
+    return {"colliders": len(rects)}
@@ -0,0 +1,79 @@
+import os
+
+import build_manifest
+import pass_colliders
+import pass_jumps
+import pfr_tiles
+import plane_file
+import world_compiler
+
+NAME = "grid"
+SUMMARY = [("grids:", "grids"), ("skipped:", "skipped")]
+WRITES_MAP = False
+
+# core/mapas/grids/<mapId>.grid, a plane_file with magic "PRGD" and the
+# planes below (the u16 plane first, so every plane is aligned).
+GRID_MAGIC = b"PRGD"
+GRID_VERSION = 1
+PLANES = [
+    ("behavior", "<u2"),
+    ("collision", "u1"),
+    ("jump", "u1"),
+    ("elevation", "u1"),
+]
+
+JUMP_DIR_CODES = {"up": 1, "down": 2, "left": 3, "right": 4}
+ELEVATION_SHIFT = 12
+
+
+def grid_path(map_id):
+    return os.path.join(world_compiler.GRIDS_DIR, "%s.grid" % map_id)
+
+
+def output_paths(map_id):
+    return [grid_path(map_id)]
+
+
+def encode_grid(planes):
+    return plane_file.encode(GRID_MAGIC, GRID_VERSION, PLANES, planes)
+
+
+def read_grid(path):
+    return plane_file.read(path, GRID_MAGIC, GRID_VERSION, PLANES)
+
+
+def prepare(index):
+    if not world_compiler.layout_sources_present():
+        return None
+    jump_by_value = pass_jumps.jump_behaviors(index["behaviors"])
+    return {
+        "behaviors_hash": index["behaviors_hash"],
+        "blocked_lookup": pass_colliders.blocked_lookup(index["behaviors"]),
+        "jump_lookup": pfr_tiles.behavior_lookup(
+            {value: JUMP_DIR_CODES[direction] for value, direction in jump_by_value.items()}
+        ),
+    }
+
+
+input_parts = world_compiler.behavior_input_parts
+input_paths = world_compiler.behavior_input_paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    blocks, behaviors = grid
+    payload = encode_grid(
+        {
+            "behavior": behaviors,
+            "collision": pass_colliders.blocked_grid(blocks, behaviors, state["blocked_lookup"]),
+            "jump": state["jump_lookup"][behaviors],
+            "elevation": blocks >> ELEVATION_SHIFT,
+        }
+    )
+    build_manifest.write_if_changed(grid_path(map_id), payload)
+    return {"grids": 1}
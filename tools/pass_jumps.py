@@ -0,0 +1,68 @@
+import numpy as np
+
+import pfr_tiles
+import world_compiler
+
+NAME = "jumps"
+SUMMARY = [("jumps:", "jumps"), ("skipped:", "skipped")]
+
+JUMP_NAME_TO_DIR = {
+    "MB_JUMP_EAST": "right",
+    "MB_JUMP_WEST": "left",
+    "MB_JUMP_NORTH": "up",
+    "MB_JUMP_SOUTH": "down",
+}
+
+
+def jump_behaviors(behavior_values):
+    jump_by_value = {}
+    for name, direction in JUMP_NAME_TO_DIR.items():
+        value = behavior_values.get(name)
+        if value is None:
+            continue
+        jump_by_value[value] = direction
+    return jump_by_value
+
+
+def prepare(index):
+    if not world_compiler.layout_sources_present(behaviors=False):
+        return None
+    jump_by_value = jump_behaviors(index["behaviors"])
+    if not jump_by_value:
+        print("Missing jump behavior values.")
+        return None
+    jump_dirs = [None] + sorted(set(jump_by_value.values()))
+    return {
+        "behaviors_hash": index["behaviors_hash"],
+        "jump_dirs": jump_dirs,
+        "jump_lookup": pfr_tiles.behavior_lookup(
+            {value: jump_dirs.index(direction) for value, direction in jump_by_value.items()}
+        ),
+    }
+
+
+def find_jumps(behaviors, state):
+    jump_dirs = state["jump_dirs"]
+    codes = state["jump_lookup"][behaviors]
+    ys, xs = np.nonzero(codes)
+    return [
+        {"x": x, "y": y, "dir": jump_dirs[code]}
+        for x, y, code in zip(xs.tolist(), ys.tolist(), codes[ys, xs].tolist())
+    ]
+
+
+input_parts = world_compiler.behavior_input_parts
+input_paths = world_compiler.behavior_input_paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    _, behaviors = grid
+    jumps = find_jumps(behaviors, state)
+    data["jumps"] = jumps
+    return {"jumps": len(jumps)}
@@ -0,0 +1,142 @@
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+import build_manifest
+import pfr_tiles
+import world_compiler
+
+NAME = "layers"
+SUMMARY = [("layer maps:", "layers"), ("skipped:", "skipped")]
+WRITES_MAP = False
+
+# Gameplay layers: every tile whose behaviour is one of the listed MB_* values
+# belongs to the layer. Water follows sBehaviorSurfable in metatile_behavior.c.
+LAYER_BEHAVIOR_NAMES = {
+    "tall_grass": ["MB_TALL_GRASS", "MB_CYCLING_ROAD_PULL_DOWN_GRASS"],
+    "water": [
+        "MB_POND_WATER",
+        "MB_FAST_WATER",
+        "MB_DEEP_WATER",
+        "MB_WATERFALL",
+        "MB_OCEAN_WATER",
+        "MB_UNUSED_WATER",
+        "MB_CYCLING_ROAD_WATER",
+        "MB_EASTWARD_CURRENT",
+        "MB_WESTWARD_CURRENT",
+        "MB_NORTHWARD_CURRENT",
+        "MB_SOUTHWARD_CURRENT",
+    ],
+    "ledge": ["MB_JUMP_EAST", "MB_JUMP_WEST", "MB_JUMP_NORTH", "MB_JUMP_SOUTH"],
+    "ice": ["MB_ICE", "MB_THIN_ICE", "MB_CRACKED_ICE"],
+    "spin": ["MB_SPIN_RIGHT", "MB_SPIN_LEFT", "MB_SPIN_UP", "MB_SPIN_DOWN", "MB_STOP_SPINNING"],
+    "counter": ["MB_COUNTER"],
+    "warp": [
+        "MB_CAVE_DOOR",
+        "MB_LADDER",
+        "MB_EAST_ARROW_WARP",
+        "MB_WEST_ARROW_WARP",
+        "MB_NORTH_ARROW_WARP",
+        "MB_SOUTH_ARROW_WARP",
+        "MB_FALL_WARP",
+        "MB_REGULAR_WARP",
+        "MB_LAVARIDGE_1F_WARP",
+        "MB_WARP_DOOR",
+        "MB_UP_ESCALATOR",
+        "MB_DOWN_ESCALATOR",
+        "MB_UP_RIGHT_STAIR_WARP",
+        "MB_UP_LEFT_STAIR_WARP",
+        "MB_DOWN_RIGHT_STAIR_WARP",
+        "MB_DOWN_LEFT_STAIR_WARP",
+        "MB_UNION_ROOM_WARP",
+    ],
+}
+LAYERS = list(LAYER_BEHAVIOR_NAMES)
+
+# core/mapas/layers/<mapId>.json:
+#   layers   name -> [] when no tile is in the layer, otherwise one entry per
+#            row holding flat [x0, x1, x0, x1, ...] runs with x1 exclusive
+LAYERS_VERSION = 1
+
+
+def layers_path(map_id):
+    return os.path.join(world_compiler.LAYERS_DIR, "%s.json" % map_id)
+
+
+def output_paths(map_id):
+    return [layers_path(map_id)]
+
+
+def layer_lookup(behavior_values):
+    # Bit i of lookup[behavior] is set when the behaviour is in LAYERS[i].
+    bits = {}
+    for bit, name in enumerate(LAYERS):
+        for behavior_name in LAYER_BEHAVIOR_NAMES[name]:
+            value = behavior_values.get(behavior_name)
+            if value is not None:
+                bits[value] = bits.get(value, 0) | (1 << bit)
+    return pfr_tiles.behavior_lookup(bits)
+
+
+def encode_rows(mask):
+    if not mask.any():
+        return []
+    width = mask.shape[1]
+    padded = np.zeros((mask.shape[0], width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    rows = []
+    for row in np.diff(padded, axis=1):
+        # +1 where a run starts, -1 just past where it ends, so the nonzero
+        # positions already alternate x0, x1.
+        rows.append(np.flatnonzero(row).tolist())
+    return rows
+
+
+def build_layers(behaviors, lookup):
+    height, width = behaviors.shape
+    bits = lookup[behaviors]
+    return {
+        "version": LAYERS_VERSION,
+        "width": width,
+        "height": height,
+        "layers": {
+            name: encode_rows((bits >> bit) & 1) for bit, name in enumerate(LAYERS)
+        },
+    }
+
+
+def in_layer(layers, name, x, y):
+    rows = layers["layers"].get(name)
+    if not rows or not (0 <= y < layers["height"]):
+        return False
+    # Odd insertion points fall between an x0 and its x1.
+    return bisect_right(rows[y], x) % 2 == 1
+
+
+def prepare(index):
+    if not world_compiler.layout_sources_present():
+        return None
+    return {
+        "behaviors_hash": index["behaviors_hash"],
+        "lookup": layer_lookup(index["behaviors"]),
+    }
+
+
+input_parts = world_compiler.behavior_input_parts
+input_paths = world_compiler.behavior_input_paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    _, behaviors = grid
+    layers = build_layers(behaviors, state["lookup"])
+    payload = json.dumps(layers, ensure_ascii=True, separators=(",", ":")) + "\n"
+    build_manifest.write_if_changed(layers_path(map_id), payload.encode("ascii"))
+    return {"layers": 1}
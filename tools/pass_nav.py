@@ -0,0 +1,423 @@
+import os
+from collections import deque
+
+import numpy as np
+
+import build_manifest
+import pass_colliders
+import pass_jumps
+import plane_file
+import world_compiler
+from world_compiler import to_int
+
+NAME = "nav"
+SUMMARY = [
+    ("nav maps:", "nav"),
+    ("ledge edges:", "ledges"),
+    ("exit fields:", "exit_fields"),
+    ("skipped:", "skipped"),
+]
+WRITES_MAP = False
+
+# core/mapas/nav/<mapId>.nav, a plane_file with magic "PRNV" and the planes
+# of nav_planes():
+#     region     weakly connected walk area; tiles in different regions can
+#                never reach each other (NO_REGION on unwalkable tiles)
+#     component  strongly connected area; tiles in the same component reach
+#                each other both ways. Only ledge jumps are one-way, so
+#                components join step-connected areas through ledge cycles.
+#     exit_dist  steps to the nearest door/warp tile (UNREACHABLE if none)
+#     exit       index in the map's events of that door (UNREACHABLE if none),
+#                the lowest index among equally near ones
+#     exit_dist_N  steps to the tiles of one door, one plane per door event
+#                with exit tiles, in event order; only the first
+#                EXIT_FIELD_LIMIT doors get one (read_nav lists their event
+#                indices as exit_events)
+#     moves      MOVE_BITS for a step from the tile, JUMP_BITS for a ledge
+#                jump that lands two tiles away
+# Walkable tiles are the ones the collider grid leaves open, plus every warp
+# tile (warps set in walls are entered, never walked through). Connection
+# strips span a whole map edge, so only their open tiles are exits. A step
+# also needs matching elevations, unless either side is elevation 0 or 15.
+NAV_MAGIC = b"PRNV"
+NAV_VERSION = 2
+PLANES = [
+    ("region", "<u2"),
+    ("component", "<u2"),
+    ("exit_dist", "<u2"),
+    ("exit", "<u2"),
+    ("moves", "u1"),
+]
+NO_REGION = 0xFFFF
+UNREACHABLE = 0xFFFF
+# Enough for every FireRed map (Saffron's gym has the most doors, 33).
+EXIT_FIELD_LIMIT = 64
+
+DIRECTIONS = [("up", 0, -1), ("down", 0, 1), ("left", -1, 0), ("right", 1, 0)]
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+MOVE_BITS = {name: 1 << idx for idx, (name, _, _) in enumerate(DIRECTIONS)}
+JUMP_BITS = {name: 1 << (idx + 4) for idx, (name, _, _) in enumerate(DIRECTIONS)}
+ANY_ELEVATION = (0, 15)
+ELEVATION_SHIFT = 12
+
+
+def nav_path(map_id):
+    return os.path.join(world_compiler.NAV_DIR, "%s.nav" % map_id)
+
+
+def output_paths(map_id):
+    return [nav_path(map_id)]
+
+
+def nav_planes(field_count):
+    # The per-door u16 fields go before the u8 moves plane.
+    fields = [("exit_dist_%d" % i, "<u2") for i in range(field_count)]
+    return PLANES[:-1] + fields + PLANES[-1:]
+
+
+def encode_nav(planes):
+    arrays = dict(planes)
+    fields = arrays.pop("exit_fields")
+    for i, field in enumerate(fields):
+        arrays["exit_dist_%d" % i] = field
+    return plane_file.encode(NAV_MAGIC, NAV_VERSION, nav_planes(len(fields)), arrays)
+
+
+def read_nav(path):
+    _, _, plane_count = plane_file.read_header(path, NAV_MAGIC, NAV_VERSION)
+    field_count = max(0, plane_count - len(PLANES))
+    nav = plane_file.read(path, NAV_MAGIC, NAV_VERSION, nav_planes(field_count))
+    nav["exit_fields"] = [nav.pop("exit_dist_%d" % i) for i in range(field_count)]
+    # Every door with exit tiles is the nearest one on its own tiles, and
+    # the fields follow event order.
+    doors = np.unique(nav["exit"][nav["exit_dist"] == 0])
+    nav["exit_events"] = doors[:field_count].tolist()
+    return nav
+
+
+def shifted(grid, dx, dy, fill):
+    # out[..., y, x] = grid[..., y + dy, x + dx], fill outside the map.
+    out = np.full_like(grid, fill)
+    height, width = grid.shape[-2:]
+    out[..., max(0, -dy) : height - max(0, dy), max(0, -dx) : width - max(0, dx)] = grid[
+        ..., max(0, dy) : height - max(0, -dy), max(0, dx) : width - max(0, -dx)
+    ]
+    return out
+
+
+def exit_tiles(data, blocked):
+    # {(x, y): event index} for door events, first event wins on overlap.
+    # Warps count on any tile; connection strips only where not blocked.
+    height, width = blocked.shape
+    exits = {}
+    for idx, event in enumerate(data.get("events") or []):
+        if not isinstance(event, dict) or event.get("type") != "door":
+            continue
+        rect = event.get("rect") if isinstance(event.get("rect"), dict) else {}
+        x, y = to_int(rect.get("x")), to_int(rect.get("y"))
+        w, h = to_int(rect.get("w"), 1), to_int(rect.get("h"), 1)
+        target = event.get("target") if isinstance(event.get("target"), dict) else {}
+        strip = "connection" in target
+        for ty in range(max(0, y), min(height, y + h)):
+            for tx in range(max(0, x), min(width, x + w)):
+                if not (strip and blocked[ty, tx]):
+                    exits.setdefault((tx, ty), idx)
+    return exits
+
+
+def ledge_grids(behaviors, jump_dir_by_value):
+    # Direction -> bool grid of ledges jumped when moving that way.
+    return {
+        name: np.isin(behaviors, [value for value, d in jump_dir_by_value.items() if d == name])
+        for name, _, _ in DIRECTIONS
+    }
+
+
+def step_grids(walkable, elevation, ledges):
+    # Direction -> bool grid of tiles that can step one tile that way. Moving
+    # onto a ledge the way it faces is a jump, never a step.
+    free = np.isin(elevation, ANY_ELEVATION)
+    steps = {}
+    for name, dx, dy in DIRECTIONS:
+        target_walkable = shifted(walkable, dx, dy, False) & ~shifted(ledges[name], dx, dy, False)
+        target_elevation = shifted(elevation, dx, dy, 0)
+        target_free = shifted(free, dx, dy, True)
+        steps[name] = (
+            walkable
+            & target_walkable
+            & (free | target_free | (elevation == target_elevation))
+        )
+    return steps
+
+
+def jump_grids(walkable, ledges):
+    # Direction -> bool grid of tiles that can jump the ledge next to them.
+    return {
+        name: walkable
+        & shifted(ledges[name], dx, dy, False)
+        & shifted(walkable, 2 * dx, 2 * dy, False)
+        for name, dx, dy in DIRECTIONS
+    }
+
+
+def label_areas(walkable, steps):
+    # Labels the areas joined by two-way steps with the flat index of each
+    # area's first tile, by min-propagation with pointer jumps.
+    height, width = walkable.shape
+    labels = np.where(walkable, np.arange(height * width).reshape(height, width), -1)
+    big = height * width
+    while True:
+        best = np.where(walkable, labels, big)
+        for name, dx, dy in DIRECTIONS:
+            best = np.where(steps[name], np.minimum(best, shifted(labels, dx, dy, big)), best)
+        flat = best.ravel()
+        flat[walkable.ravel()] = flat[flat[walkable.ravel()]]
+        best = np.where(walkable, flat.reshape(height, width), -1)
+        if np.array_equal(best, labels):
+            return labels
+        labels = best
+
+
+def strong_components(nodes, edges):
+    # Tarjan's algorithm over {node: [successors]}, iteratively; returns
+    # {node: component id} with ids in order of each component's first node.
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    found = []
+    counter = 0
+    for root in nodes:
+        if root in index_of:
+            continue
+        work = [(root, iter(edges.get(root, ())))]
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for succ in successors:
+                if succ not in index_of:
+                    index_of[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(edges.get(succ, ()))))
+                    advanced = True
+                    break
+                if succ in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[succ])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    members.append(member)
+                    if member == node:
+                        break
+                found.append(members)
+    first = sorted(found, key=min)
+    return {member: cid for cid, members in enumerate(first) for member in members}
+
+
+def weak_components(nodes, edges):
+    parent = {node: node for node in nodes}
+
+    def root(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node, successors in edges.items():
+        for succ in successors:
+            a, b = root(node), root(succ)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+    roots = {}
+    return {node: roots.setdefault(root(node), len(roots)) for node in nodes}
+
+
+def exit_distances(walkable, steps, jumps, exits):
+    # BFS backwards from each door's tiles, all doors at once, one wavefront
+    # per step. Returns (door event indices, (doors, height, width) steps).
+    height, width = walkable.shape
+    doors = sorted(set(exits.values()))
+    dist = np.full((len(doors), height, width), UNREACHABLE, dtype=np.int32)
+    slot = {idx: i for i, idx in enumerate(doors)}
+    for (x, y), idx in exits.items():
+        dist[slot[idx], y, x] = 0
+    frontier = dist == 0
+    level = 0
+    while frontier.any():
+        level += 1
+        reached = np.zeros_like(frontier)
+        for name, dx, dy in DIRECTIONS:
+            reached |= steps[name] & shifted(frontier, dx, dy, False)
+            reached |= jumps[name] & shifted(frontier, 2 * dx, 2 * dy, False)
+        frontier = reached & (dist == UNREACHABLE)
+        dist[frontier] = level
+    return doors, dist
+
+
+def nearest_exit(doors, dist):
+    # (steps, door event index) of the nearest door per tile; ties go to the
+    # lowest event index, UNREACHABLE where no door can be reached.
+    height, width = dist.shape[1:]
+    if not doors:
+        none = np.full((height, width), UNREACHABLE, dtype=np.int32)
+        return none, none.copy()
+    best = dist.min(axis=0)
+    nearest = np.array(doors)[dist.argmin(axis=0)]
+    return best, np.where(best == UNREACHABLE, UNREACHABLE, nearest)
+
+
+def build_nav(blocked, behaviors, elevation, exits, jump_dir_by_value):
+    height, width = blocked.shape
+    walkable = ~blocked
+    for x, y in exits:
+        walkable[y, x] = True
+    ledges = ledge_grids(behaviors, jump_dir_by_value)
+    steps = step_grids(walkable, elevation, ledges)
+    jumps = jump_grids(walkable, ledges)
+
+    # Areas are joined by two-way steps; jumps and the rare one-way step (next
+    # to a ledge inside a door strip) become directed edges between areas.
+    two_way = {
+        name: steps[name] & shifted(steps[OPPOSITE[name]], dx, dy, False)
+        for name, dx, dy in DIRECTIONS
+    }
+    labels = label_areas(walkable, two_way)
+    areas = np.unique(labels[walkable]).tolist()
+    area_edges = {}
+    flat_labels = labels.ravel()
+    one_way = [(steps[name] & ~two_way[name], dx, dy) for name, dx, dy in DIRECTIONS]
+    one_way += [(jumps[name], 2 * dx, 2 * dy) for name, dx, dy in DIRECTIONS]
+    for moves_from, dx, dy in one_way:
+        ys, xs = np.nonzero(moves_from)
+        for src, dst in zip(
+            flat_labels[ys * width + xs].tolist(),
+            flat_labels[(ys + dy) * width + (xs + dx)].tolist(),
+        ):
+            if src != dst:
+                area_edges.setdefault(src, set()).add(dst)
+    ledge_count = sum(int(jumps[name].sum()) for name, _, _ in DIRECTIONS)
+    edges = {src: sorted(dsts) for src, dsts in area_edges.items()}
+    strong = strong_components(areas, edges)
+    weak = weak_components(areas, edges)
+
+    region = np.full((height, width), NO_REGION, dtype=np.int64)
+    component = np.full((height, width), NO_REGION, dtype=np.int64)
+    if areas:
+        area_ids = np.array(areas)
+        positions = np.searchsorted(area_ids, labels[walkable])
+        region[walkable] = np.array([weak[area] for area in areas])[positions]
+        component[walkable] = np.array([strong[area] for area in areas])[positions]
+
+    moves = np.zeros((height, width), dtype=np.uint8)
+    for name, _, _ in DIRECTIONS:
+        moves |= np.where(steps[name], MOVE_BITS[name], 0).astype(np.uint8)
+        moves |= np.where(jumps[name], JUMP_BITS[name], 0).astype(np.uint8)
+    doors, door_dist = exit_distances(walkable, steps, jumps, exits)
+    exit_dist, nearest = nearest_exit(doors, door_dist)
+    planes = {
+        "region": region,
+        "component": component,
+        "exit_dist": exit_dist,
+        "exit": nearest,
+        "exit_fields": list(door_dist[:EXIT_FIELD_LIMIT]),
+        "moves": moves,
+    }
+    return planes, ledge_count
+
+
+def neighbors(nav, x, y):
+    # Tiles one move away from (x, y), ledge jumps included.
+    moves = int(nav["moves"][y, x])
+    for name, dx, dy in DIRECTIONS:
+        if moves & MOVE_BITS[name]:
+            yield x + dx, y + dy
+        if moves & JUMP_BITS[name]:
+            yield x + 2 * dx, y + 2 * dy
+
+
+def can_reach(nav, start, goal):
+    (sx, sy), (gx, gy) = start, goal
+    if nav["region"][sy, sx] == NO_REGION or nav["region"][sy, sx] != nav["region"][gy, gx]:
+        return False
+    if nav["component"][sy, sx] == nav["component"][gy, gx]:
+        return True
+    # Same region, different components: only a search can tell which way
+    # the ledges allow.
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        tile = queue.popleft()
+        if tile == goal:
+            return True
+        for step in neighbors(nav, *tile):
+            if step not in seen:
+                seen.add(step)
+                queue.append(step)
+    return False
+
+
+def step_toward_exit(nav, x, y, event=None):
+    # Next tile on a shortest path to the nearest door, or to the door event
+    # with the given index, or None (also when that door has no field).
+    if event is None:
+        dist = nav["exit_dist"]
+    elif event in nav["exit_events"]:
+        dist = nav["exit_fields"][nav["exit_events"].index(event)]
+    else:
+        return None
+    here = int(dist[y, x])
+    if here in (0, UNREACHABLE):
+        return None
+    for step in neighbors(nav, x, y):
+        if int(dist[step[1], step[0]]) == here - 1:
+            return step
+    return None
+
+
+def prepare(index):
+    if not world_compiler.layout_sources_present():
+        return None
+    return {
+        "behaviors_hash": index["behaviors_hash"],
+        "blocked_lookup": pass_colliders.blocked_lookup(index["behaviors"]),
+        "jump_dir_by_value": pass_jumps.jump_behaviors(index["behaviors"]),
+    }
+
+
+# Door tiles come from the map's own events, covered by its output hash.
+input_parts = world_compiler.behavior_input_parts
+input_paths = world_compiler.behavior_input_paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    blocks, behaviors = grid
+    blocked = pass_colliders.blocked_grid(blocks, behaviors, state["blocked_lookup"])
+    planes, ledge_count = build_nav(
+        blocked,
+        behaviors,
+        (blocks >> ELEVATION_SHIFT).astype(np.int64),
+        exit_tiles(data, blocked),
+        state["jump_dir_by_value"],
+    )
+    build_manifest.write_if_changed(nav_path(map_id), encode_nav(planes))
+    return {"nav": 1, "ledges": ledge_count, "exit_fields": len(planes["exit_fields"])}
@@ -0,0 +1,232 @@
+import os
+
+import build_manifest
+import pfr_index
+import portal_locks
+import world_compiler
+import world_graph
+from world_compiler import load_json, to_int
+
+NAME = "portals"
+SUMMARY = [
+    ("warps:", "warps"),
+    ("connections:", "connections"),
+    ("skipped warps:", "skipped_warps"),
+    ("skipped connections:", "skipped_connections"),
+]
+
+LOCKS_PATH = os.path.join(world_compiler.ROOT, "data", "portal-locks.json")
+
+
+def load_portal_locks():
+    if not os.path.exists(LOCKS_PATH):
+        return []
+    try:
+        data = load_json(LOCKS_PATH)
+    except Exception as exc:
+        print("Failed to read portal locks:", exc)
+        return []
+    if not isinstance(data, list):
+        return []
+    return [row for row in data if isinstance(row, dict)]
+
+
+def rect_for_connection(direction, offset, size, dest_size):
+    width, height = size
+    dest_width, dest_height = dest_size
+    if direction == "up":
+        min_x = max(0, offset)
+        max_x = min(width - 1, offset + dest_width - 1)
+        if max_x < min_x:
+            return None
+        return {"x": min_x, "y": 0, "w": max_x - min_x + 1, "h": 1}
+    if direction == "down":
+        min_x = max(0, offset)
+        max_x = min(width - 1, offset + dest_width - 1)
+        if max_x < min_x:
+            return None
+        return {"x": min_x, "y": height - 1, "w": max_x - min_x + 1, "h": 1}
+    if direction == "left":
+        min_y = max(0, offset)
+        max_y = min(height - 1, offset + dest_height - 1)
+        if max_y < min_y:
+            return None
+        return {"x": 0, "y": min_y, "w": 1, "h": max_y - min_y + 1}
+    if direction == "right":
+        min_y = max(0, offset)
+        max_y = min(height - 1, offset + dest_height - 1)
+        if max_y < min_y:
+            return None
+        return {"x": width - 1, "y": min_y, "w": 1, "h": max_y - min_y + 1}
+    return None
+
+
+def lock_rules_for_map(state, map_id):
+    by_from = state["locks_by_from"]
+    return by_from.get(None, []) + by_from.get(map_id, [])
+
+
+def prepare(index):
+    locks = load_portal_locks()
+    return {
+        "locks": locks,
+        "lock_index": portal_locks.compile_locks(locks),
+        "locks_by_from": portal_locks.rules_by_from_map(locks),
+    }
+
+
+def linked_map_ids(index, map_id):
+    map_const_to_id = index["map_const_to_id"]
+    source = index["source_by_id"].get(map_id)
+    dest_ids = set()
+    if source:
+        for link in (source.get("warp_events") or []) + (source.get("connections") or []):
+            dest_id = map_const_to_id.get(link.get("dest_map") or link.get("map"))
+            if dest_id:
+                dest_ids.add(dest_id)
+    return sorted(dest_ids)
+
+
+def input_parts(index, state, map_id, data):
+    source_hash_by_id = index["source_hash_by_id"]
+    size_by_id = index["size_by_id"]
+
+    # Every input that can change this map's events: its own source, the
+    # sources and sizes of the maps it links to, and the lock rules that
+    # could match one of its portals.
+    return [
+        source_hash_by_id.get(map_id),
+        build_manifest.hash_value(size_by_id.get(map_id)),
+        build_manifest.hash_value(
+            [
+                [dest_id, source_hash_by_id.get(dest_id), size_by_id.get(dest_id)]
+                for dest_id in linked_map_ids(index, map_id)
+            ]
+        ),
+        build_manifest.hash_value(lock_rules_for_map(state, map_id)),
+    ]
+
+
+def input_paths(index, state, map_id, data):
+    return [
+        pfr_index.source_map_path(source_id)
+        for source_id in [map_id] + linked_map_ids(index, map_id)
+    ] + [LOCKS_PATH]
+
+
+def apply(index, state, map_id, data):
+    lock_index = state["lock_index"]
+    map_const_to_id = index["map_const_to_id"]
+    source_by_id = index["source_by_id"]
+    size_by_id = index["size_by_id"]
+    source = source_by_id.get(map_id)
+    new_events = []
+    counters = {"warps": 0, "connections": 0, "skipped_warps": 0, "skipped_connections": 0}
+
+    if source:
+        warps = source.get("warp_events") or []
+        for idx, warp in enumerate(warps, start=1):
+            dest_const = warp.get("dest_map")
+            dest_id = map_const_to_id.get(dest_const)
+            if not dest_id:
+                counters["skipped_warps"] += 1
+                continue
+            dest_warps = source_by_id.get(dest_id, {}).get("warp_events") or []
+            dest_warp_index = to_int(warp.get("dest_warp_id"), 0)
+            target_x = 0
+            target_y = 0
+            if 0 <= dest_warp_index < len(dest_warps):
+                target_x = to_int(dest_warps[dest_warp_index].get("x"), 0)
+                target_y = to_int(dest_warps[dest_warp_index].get("y"), 0)
+            event = {
+                "id": "warp-%s-%s" % (map_id, idx),
+                "type": "door",
+                "rect": {
+                    "x": to_int(warp.get("x"), 0),
+                    "y": to_int(warp.get("y"), 0),
+                    "w": 1,
+                    "h": 1,
+                },
+                "once": False,
+                "target": {
+                    "mapId": dest_id,
+                    "x": target_x,
+                    "y": target_y,
+                    "facing": "down",
+                },
+                "meta": {
+                    "source": "warp",
+                    "destMap": dest_const,
+                    "destWarpId": warp.get("dest_warp_id"),
+                    "elevation": warp.get("elevation"),
+                },
+            }
+            lock = portal_locks.match_lock(lock_index, "warp", map_id, dest_id, None)
+            if lock and lock.get("flag"):
+                event["lockFlag"] = lock.get("flag")
+                event["lockMessage"] = lock.get("message") or ""
+            new_events.append(event)
+            counters["warps"] += 1
+
+        connections = source.get("connections") or []
+        for idx, conn in enumerate(connections, start=1):
+            direction = str(conn.get("direction") or "").lower()
+            dest_const = conn.get("map")
+            dest_id = map_const_to_id.get(dest_const)
+            if not dest_id:
+                counters["skipped_connections"] += 1
+                continue
+            size = size_by_id.get(map_id)
+            dest_size = size_by_id.get(dest_id)
+            if not size or not dest_size:
+                counters["skipped_connections"] += 1
+                continue
+            offset = to_int(conn.get("offset"), 0)
+            rect = rect_for_connection(direction, offset, size, dest_size)
+            if not rect:
+                counters["skipped_connections"] += 1
+                continue
+            event = {
+                "id": "conn-%s-%s-%s" % (map_id, direction or "link", idx),
+                "type": "door",
+                "rect": rect,
+                "once": False,
+                "target": {
+                    "mapId": dest_id,
+                    "connection": {"direction": direction, "offset": offset},
+                },
+                "meta": {
+                    "source": "connection",
+                    "direction": direction,
+                    "offset": offset,
+                    "destMap": dest_const,
+                },
+            }
+            lock = portal_locks.match_lock(lock_index, "connection", map_id, dest_id, direction)
+            if lock and lock.get("flag"):
+                event["lockFlag"] = lock.get("flag")
+                event["lockMessage"] = lock.get("message") or ""
+            new_events.append(event)
+            counters["connections"] += 1
+
+    data["events"] = new_events
+    data.setdefault("npcs", [])
+    return counters
+
+
+def finalize(index, state, maps):
+    written = world_graph.write_graph(world_graph.build_graph(maps))
+    print("World graph:", world_graph.GRAPH_PATH, "written" if written else "unchanged")
+    locks = state["locks"]
+    issues = portal_locks.validate_locks(
+        locks,
+        state["lock_index"],
+        {map_id for map_id, _ in maps},
+        portal_locks.portal_queries(maps),
+    )
+    portal_locks.write_report(locks, issues)
+    if issues:
+        print(
+            "Portal locks: %d rules, %d issues, see %s"
+            % (len(locks), len(issues), portal_locks.REPORT_PATH)
+        )
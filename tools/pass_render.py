@@ -0,0 +1,233 @@
+import io
+import os
+from functools import lru_cache
+
+import numpy as np
+
+import build_manifest
+import pfr_tiles
+import world_compiler
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+NAME = "render"
+# Metatiles drawn and cache hits depend on each worker's lru_cache, so they
+# go to --stats (render_metatiles_drawn, render_metatile_cache_hits) rather
+# than the summary, which must match a serial run.
+SUMMARY = [("images:", "images"), ("skipped:", "skipped")]
+WRITES_MAP = False
+
+# core/mapas/images/<mapId>.png, 16 px per metatile, drawn the way the GBA
+# composites a map: the backdrop (primary palette 0, colour 0), then the
+# bottom and top layer of each metatile with colour 0 transparent. Tile ids
+# and metatile ids below 640 come from the primary tileset, palettes below 7
+# from the primary tileset's palette list (NUM_PALS_IN_PRIMARY).
+METATILE_SIZE = 16
+TILE_SIZE = 8
+PRIMARY_TILES = 640
+PRIMARY_PALETTES = 7
+TILE_ID_MASK = 0x03FF
+HFLIP = 0x0400
+VFLIP = 0x0800
+PALETTE_SHIFT = 12
+# Rendered metatiles kept per process (768 bytes each), shared by every map
+# using the same tileset pair.
+METATILE_CACHE_SIZE = 16384
+
+
+def image_path(map_id):
+    return os.path.join(world_compiler.IMAGES_DIR, "%s.png" % map_id)
+
+
+def output_paths(map_id):
+    return [image_path(map_id)]
+
+
+def read_jasc_palette(path):
+    with open(path, "r", encoding="ascii") as handle:
+        lines = handle.read().split()
+    if lines[:2] != ["JASC-PAL", "0100"]:
+        raise ValueError("Unsupported palette: %s" % path)
+    count = int(lines[2])
+    colors = np.array(lines[3 : 3 + count * 3], dtype=np.uint8).reshape(count, 3)
+    palette = np.zeros((16, 3), dtype=np.uint8)
+    palette[: min(count, 16)] = colors[:16]
+    return palette
+
+
+def tileset_key(graphics):
+    return graphics["tiles"], tuple(graphics["palettes"]), graphics["metatiles"]
+
+
+@lru_cache(maxsize=None)
+def load_tileset(key):
+    tiles_path, palette_paths, metatiles_path = key
+    with Image.open(tiles_path) as image:
+        # Indexed 4bpp sheets: pixel values are palette indices.
+        pixels = np.asarray(image) & 0x0F
+    rows, cols = pixels.shape[0] // TILE_SIZE, pixels.shape[1] // TILE_SIZE
+    tiles = (
+        pixels[: rows * TILE_SIZE, : cols * TILE_SIZE]
+        .reshape(rows, TILE_SIZE, cols, TILE_SIZE)
+        .transpose(0, 2, 1, 3)
+        .reshape(rows * cols, TILE_SIZE, TILE_SIZE)
+    )
+    palettes = np.zeros((16, 16, 3), dtype=np.uint8)
+    for idx, path in enumerate(palette_paths[:16]):
+        palettes[idx] = read_jasc_palette(path)
+    metatiles = np.fromfile(metatiles_path, dtype="<u2")
+    return {
+        "tiles": tiles,
+        "palettes": palettes,
+        "metatiles": metatiles[: len(metatiles) // 8 * 8].reshape(-1, 8),
+    }
+
+
+@lru_cache(maxsize=METATILE_CACHE_SIZE)
+def render_metatile(primary_key, secondary_key, metatile_id):
+    primary = load_tileset(primary_key)
+    secondary = load_tileset(secondary_key)
+    out = np.empty((METATILE_SIZE, METATILE_SIZE, 3), dtype=np.uint8)
+    out[:] = primary["palettes"][0][0]
+    if metatile_id < pfr_tiles.PRIMARY_METATILES:
+        metatiles, local_id = primary["metatiles"], metatile_id
+    else:
+        metatiles, local_id = secondary["metatiles"], metatile_id - pfr_tiles.PRIMARY_METATILES
+    if local_id >= len(metatiles):
+        return out
+    # Bottom layer's four tiles (top-left, top-right, bottom-left,
+    # bottom-right), then the top layer's.
+    for slot, entry in enumerate(metatiles[local_id].tolist()):
+        tile_id = entry & TILE_ID_MASK
+        if tile_id < PRIMARY_TILES:
+            tiles, local_tile = primary["tiles"], tile_id
+        else:
+            tiles, local_tile = secondary["tiles"], tile_id - PRIMARY_TILES
+        if local_tile >= len(tiles):
+            continue
+        pixels = tiles[local_tile]
+        if entry & HFLIP:
+            pixels = pixels[:, ::-1]
+        if entry & VFLIP:
+            pixels = pixels[::-1, :]
+        palette_id = entry >> PALETTE_SHIFT
+        owner = primary if palette_id < PRIMARY_PALETTES else secondary
+        y0 = (slot % 4 // 2) * TILE_SIZE
+        x0 = (slot % 2) * TILE_SIZE
+        region = out[y0 : y0 + TILE_SIZE, x0 : x0 + TILE_SIZE]
+        opaque = pixels != 0
+        region[opaque] = owner["palettes"][palette_id][pixels[opaque]]
+    out.setflags(write=False)
+    return out
+
+
+def render_map(blocks, primary_key, secondary_key):
+    # (PIL image, metatiles drawn, cache hits). Each distinct metatile is
+    # drawn (or fetched) once, then the map is assembled with one gather.
+    height, width = blocks.shape
+    ids, inverse = np.unique(blocks & pfr_tiles.TILE_INDEX_MASK, return_inverse=True)
+    before = render_metatile.cache_info()
+    stack = np.stack(
+        [render_metatile(primary_key, secondary_key, metatile_id) for metatile_id in ids.tolist()]
+    )
+    after = render_metatile.cache_info()
+
+    # FireRed maps use at most 13 palettes of 16 colours, so the distinct
+    # colours fit an 8-bit indexed PNG.
+    packed = (
+        stack[..., 0].astype(np.uint32) << 16
+        | stack[..., 1].astype(np.uint32) << 8
+        | stack[..., 2].astype(np.uint32)
+    )
+    colors, color_index = np.unique(packed, return_inverse=True)
+    tiles = color_index.reshape(packed.shape).astype(np.uint8)
+    pixels = (
+        tiles[inverse.reshape(height, width)]
+        .transpose(0, 2, 1, 3)
+        .reshape(height * METATILE_SIZE, width * METATILE_SIZE)
+    )
+    if len(colors) <= 256:
+        image = Image.fromarray(pixels, "P")
+        palette = np.stack([colors >> 16, colors >> 8 & 0xFF, colors & 0xFF], axis=1)
+        image.putpalette(palette.astype(np.uint8).ravel().tolist())
+    else:
+        rgb = stack[inverse.reshape(height, width)].transpose(0, 2, 1, 3, 4)
+        image = Image.fromarray(
+            np.ascontiguousarray(
+                rgb.reshape(height * METATILE_SIZE, width * METATILE_SIZE, 3)
+            ),
+            "RGB",
+        )
+    return image, after.misses - before.misses, after.hits - before.hits
+
+
+def encode_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def layout_graphics(index, resolved):
+    graphics = [
+        index["tileset_graphics"].get(resolved["layout"].get(field))
+        for field in ("primary_tileset", "secondary_tileset")
+    ]
+    if None in graphics:
+        return None
+    return graphics
+
+
+def prepare(index):
+    if Image is None:
+        print("Missing Pillow module (pip install pillow), needed for the render pass")
+        return None
+    # One hash per tileset over every file it renders from, so maps only
+    # re-render when their own tilesets' graphics change.
+    graphics_hashes = {}
+    for name, graphics in index["tileset_graphics"].items():
+        if graphics:
+            paths = [graphics["tiles"], graphics["metatiles"]] + graphics["palettes"]
+            graphics_hashes[name] = build_manifest.combine_hashes(
+                [build_manifest.hash_file(path) for path in paths]
+            )
+    return {"graphics_hashes": graphics_hashes}
+
+
+def input_parts(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return [None]
+    return world_compiler.layout_input_parts(index, resolved) + [
+        state["graphics_hashes"].get(resolved["layout"].get(field))
+        for field in ("primary_tileset", "secondary_tileset")
+    ]
+
+
+def input_paths(index, state, map_id, data):
+    paths = world_compiler.layout_input_paths(index, map_id, data)
+    paths.extend([world_compiler.GRAPHICS_PATH, world_compiler.CORE_GRAPHICS_PATH])
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    for graphics in (resolved and layout_graphics(index, resolved)) or []:
+        paths.extend([graphics["tiles"], graphics["metatiles"]] + graphics["palettes"])
+    return paths
+
+
+def apply(index, state, map_id, data):
+    resolved = world_compiler.resolve_layout(index, map_id, data)
+    if not resolved:
+        return None
+    graphics = layout_graphics(index, resolved)
+    if not graphics:
+        return None
+    grid = world_compiler.load_layout_grid(index, resolved)
+    if grid is None:
+        return None
+    blocks, _ = grid
+    image, drawn, cached = render_map(blocks, tileset_key(graphics[0]), tileset_key(graphics[1]))
+    build_manifest.write_if_changed(image_path(map_id), encode_png(image))
+    world_compiler.add_map_count("render_metatiles_drawn", drawn)
+    world_compiler.add_map_count("render_metatile_cache_hits", cached)
+    return {"images": 1}
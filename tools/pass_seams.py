@@ -0,0 +1,155 @@
+import json
+import os
+
+import build_manifest
+import pass_portals
+import pfr_index
+import world_compiler
+from world_compiler import to_int
+
+NAME = "seams"
+SUMMARY = [("seam maps:", "seams"), ("seams:", "neighbors"), ("skipped seams:", "skipped_seams")]
+WRITES_MAP = False
+
+# core/mapas/seams/<mapId>.json, one entry per edge connection:
+#   transform  neighbour tile = this map's tile + (dx, dy)
+#   origin     neighbour's top-left tile in this map's coordinates
+#   seam       strip of this map that crosses into the neighbour (the
+#              connection event's rect)
+#   rect       part of the neighbour within PRELOAD_MARGIN tiles of this
+#              map's edge, in this map's coordinates
+#   neighborRect  the same tiles in the neighbour's coordinates
+# preload lists each neighbour once, in connection order, for prefetching.
+SEAMS_VERSION = 1
+# Half the FireRed view (15x10 tiles) plus one tile, rounded up, so everything
+# the camera can show past an edge is covered.
+PRELOAD_MARGIN = 8
+
+
+def seams_path(map_id):
+    return os.path.join(world_compiler.SEAMS_DIR, "%s.json" % map_id)
+
+
+def output_paths(map_id):
+    return [seams_path(map_id)]
+
+
+def neighbor_origin(direction, offset, size, dest_size):
+    width, height = size
+    dest_width, dest_height = dest_size
+    if direction == "up":
+        return offset, -dest_height
+    if direction == "down":
+        return offset, height
+    if direction == "left":
+        return -dest_width, offset
+    if direction == "right":
+        return width, offset
+    return None
+
+
+def margin_box(direction, size, margin):
+    # (x0, y0, x1, y1), exclusive, of the band just past the given edge.
+    width, height = size
+    if direction == "up":
+        return 0, -margin, width, 0
+    if direction == "down":
+        return 0, height, width, height + margin
+    if direction == "left":
+        return -margin, 0, 0, height
+    return width, 0, width + margin, height
+
+
+def build_seam(direction, offset, size, dest_size, margin=PRELOAD_MARGIN):
+    origin = neighbor_origin(direction, offset, size, dest_size)
+    seam = pass_portals.rect_for_connection(direction, offset, size, dest_size)
+    if origin is None or seam is None:
+        return None
+    origin_x, origin_y = origin
+    box_x0, box_y0, box_x1, box_y1 = margin_box(direction, size, margin)
+    x0 = max(box_x0, origin_x)
+    y0 = max(box_y0, origin_y)
+    x1 = min(box_x1, origin_x + dest_size[0])
+    y1 = min(box_y1, origin_y + dest_size[1])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return {
+        "transform": {"dx": -origin_x, "dy": -origin_y},
+        "origin": {"x": origin_x, "y": origin_y},
+        "seam": seam,
+        "rect": {"x": x0, "y": y0, "w": x1 - x0, "h": y1 - y0},
+        "neighborRect": {"x": x0 - origin_x, "y": y0 - origin_y, "w": x1 - x0, "h": y1 - y0},
+    }
+
+
+def connections_for(index, map_id):
+    # (direction, offset, dest_id) for each connection whose target is known.
+    source = index["source_by_id"].get(map_id) or {}
+    links = []
+    for conn in source.get("connections") or []:
+        dest_id = index["map_const_to_id"].get(conn.get("map"))
+        links.append(
+            (str(conn.get("direction") or "").lower(), to_int(conn.get("offset"), 0), dest_id)
+        )
+    return links
+
+
+def prepare(index):
+    return {}
+
+
+def input_parts(index, state, map_id, data):
+    size_by_id = index["size_by_id"]
+    return [
+        index["source_hash_by_id"].get(map_id),
+        build_manifest.hash_value(size_by_id.get(map_id)),
+        build_manifest.hash_value(
+            [
+                [dest_id, size_by_id.get(dest_id)]
+                for _, _, dest_id in connections_for(index, map_id)
+            ]
+        ),
+    ]
+
+
+def input_paths(index, state, map_id, data):
+    # The seams move with the linked maps' sizes, so their sources count too.
+    return [
+        pfr_index.source_map_path(source_id)
+        for source_id in [map_id] + pass_portals.linked_map_ids(index, map_id)
+    ]
+
+
+def apply(index, state, map_id, data):
+    size = index["size_by_id"].get(map_id)
+    if not size:
+        return None
+    counters = {"seams": 1, "neighbors": 0, "skipped_seams": 0}
+    neighbors = []
+    for direction, offset, dest_id in connections_for(index, map_id):
+        dest_size = index["size_by_id"].get(dest_id)
+        seam = build_seam(direction, offset, size, dest_size) if dest_size else None
+        if not seam:
+            counters["skipped_seams"] += 1
+            continue
+        neighbor = {
+            "mapId": dest_id,
+            "direction": direction,
+            "connectionOffset": offset,
+            "width": dest_size[0],
+            "height": dest_size[1],
+        }
+        neighbor.update(seam)
+        neighbors.append(neighbor)
+        counters["neighbors"] += 1
+    seams = {
+        "version": SEAMS_VERSION,
+        "mapId": map_id,
+        "width": size[0],
+        "height": size[1],
+        "neighbors": neighbors,
+        "preload": list(dict.fromkeys(neighbor["mapId"] for neighbor in neighbors)),
+    }
+    payload = json.dumps(seams, ensure_ascii=True, separators=(",", ":")) + "\n"
+    build_manifest.write_if_changed(seams_path(map_id), payload.encode("ascii"))
+    return counters
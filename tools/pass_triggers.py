@@ -0,0 +1,136 @@
+import json
+import os
+
+import numpy as np
+
+import build_manifest
+import world_compiler
+
+NAME = "triggers"
+SUMMARY = [("trigger maps:", "triggers"), ("skipped:", "skipped")]
+WRITES_MAP = False
+
+# core/mapas/triggers/<mapId>.json:
+#   entries  what can fire on a tile: {"type": "event", "index", "id"} for
+#            events[index] or {"type": "jump", "index", "dir"} for jumps[index]
+#   slots    distinct entry lists; slot 0 is always the empty list. Entries in
+#            a slot keep their order in the map, so first-match is preserved.
+#   cells    (maps up to DENSE_MAX_CELLS tiles) row-major slot per tile
+#   rows     (larger maps) per row, [x0, x1, slot] runs with x1 exclusive and
+#            empty runs left out
+TRIGGERS_VERSION = 1
+DENSE_MAX_CELLS = 1024
+
+
+def triggers_path(map_id):
+    return os.path.join(world_compiler.TRIGGERS_DIR, "%s.json" % map_id)
+
+
+def output_paths(map_id):
+    return [triggers_path(map_id)]
+
+
+def collect_entries(data):
+    entries = []
+    tiles = []
+    for idx, event in enumerate(data.get("events") or []):
+        rect = event.get("rect") if isinstance(event, dict) else None
+        if not isinstance(rect, dict):
+            continue
+        entries.append({"type": "event", "index": idx, "id": event.get("id")})
+        tiles.append(
+            (
+                world_compiler.to_int(rect.get("x")),
+                world_compiler.to_int(rect.get("y")),
+                world_compiler.to_int(rect.get("w"), 1),
+                world_compiler.to_int(rect.get("h"), 1),
+            )
+        )
+    for idx, jump in enumerate(data.get("jumps") or []):
+        if not isinstance(jump, dict):
+            continue
+        entries.append({"type": "jump", "index": idx, "dir": jump.get("dir")})
+        tiles.append(
+            (world_compiler.to_int(jump.get("x")), world_compiler.to_int(jump.get("y")), 1, 1)
+        )
+    return entries, tiles
+
+
+def build_triggers(width, height, entries, tiles):
+    by_tile = {}
+    for entry_idx, (x, y, w, h) in enumerate(tiles):
+        for ty in range(max(0, y), min(height, y + h)):
+            for tx in range(max(0, x), min(width, x + w)):
+                by_tile.setdefault((tx, ty), []).append(entry_idx)
+
+    slots = [[]]
+    slot_by_key = {(): 0}
+    grid = np.zeros((height, width), dtype=np.int32)
+    for (tx, ty), entry_ids in sorted(by_tile.items()):
+        key = tuple(entry_ids)
+        if key not in slot_by_key:
+            slot_by_key[key] = len(slots)
+            slots.append(entry_ids)
+        grid[ty, tx] = slot_by_key[key]
+
+    triggers = {
+        "version": TRIGGERS_VERSION,
+        "width": width,
+        "height": height,
+        "entries": entries,
+        "slots": slots,
+    }
+    if width * height <= DENSE_MAX_CELLS:
+        triggers["cells"] = grid.ravel().tolist()
+        return triggers
+    rows = []
+    for row in grid:
+        starts = np.flatnonzero(np.diff(row, prepend=-1))
+        ends = np.append(starts[1:], width)
+        rows.append(
+            [
+                [int(x0), int(x1), int(row[x0])]
+                for x0, x1 in zip(starts, ends)
+                if row[x0]
+            ]
+        )
+    triggers["rows"] = rows
+    return triggers
+
+
+def slot_at(triggers, x, y):
+    if not (0 <= x < triggers["width"] and 0 <= y < triggers["height"]):
+        return 0
+    if "cells" in triggers:
+        return triggers["cells"][y * triggers["width"] + x]
+    for x0, x1, slot in triggers["rows"][y]:
+        if x0 <= x < x1:
+            return slot
+        if x0 > x:
+            break
+    return 0
+
+
+def entries_at(triggers, x, y):
+    return [triggers["entries"][idx] for idx in triggers["slots"][slot_at(triggers, x, y)]]
+
+
+def prepare(index):
+    return {}
+
+
+def input_parts(index, state, map_id, data):
+    # Only the map's own events, jumps and size feed the index, and those are
+    # covered by the map's output hash in the manifest.
+    return []
+
+
+def apply(index, state, map_id, data):
+    size = world_compiler.get_map_size(data)
+    if not size:
+        return None
+    entries, tiles = collect_entries(data)
+    triggers = build_triggers(size[0], size[1], entries, tiles)
+    payload = json.dumps(triggers, ensure_ascii=True, separators=(",", ":")) + "\n"
+    build_manifest.write_if_changed(triggers_path(map_id), payload.encode("ascii"))
+    return {"triggers": 1}
@@ -0,0 +1,285 @@
+import json
+import os
+import re
+
+import build_manifest
+import build_stats
+
+ROOT = build_manifest.ROOT
+PFR_ROOT = os.path.join(ROOT, "core", "pokefirered-master", "pokefirered-master")
+SOURCE_DIR = os.path.join(PFR_ROOT, "data", "maps")
+LAYOUTS_PATH = os.path.join(PFR_ROOT, "data", "layouts", "layouts.json")
+TILESETS_HEADERS_PATH = os.path.join(PFR_ROOT, "src", "data", "tilesets", "headers.h")
+METATILES_PATH = os.path.join(PFR_ROOT, "src", "data", "tilesets", "metatiles.h")
+GRAPHICS_PATH = os.path.join(PFR_ROOT, "src", "data", "tilesets", "graphics.h")
+# The General, GenericBuilding1 and DepartmentStore graphics live here instead.
+CORE_GRAPHICS_PATH = os.path.join(PFR_ROOT, "src", "graphics.c")
+BEHAVIORS_PATH = os.path.join(PFR_ROOT, "include", "constants", "metatile_behaviors.h")
+CACHE_PATH = os.path.join(build_manifest.CACHE_DIR, "pfr-index.json")
+
+INDEX_VERSION = 1
+
+
+def parse_behavior_constants(path):
+    pattern = re.compile(r"#define\s+(MB_[A-Z0-9_]+)\s+(0x[0-9A-Fa-f]+|[0-9]+)\b")
+    values = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            match = pattern.search(line)
+            if not match:
+                continue
+            values[match.group(1)] = int(match.group(2), 0)
+    return values
+
+
+def parse_metatile_attr_paths(path):
+    pattern = re.compile(
+        r'const\s+u32\s+(gMetatileAttributes_[A-Za-z0-9_]+)\[\]\s*=\s*INCBIN_U32\("([^"]+)"\);'
+    )
+    mapping = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            match = pattern.search(line)
+            if not match:
+                continue
+            mapping[match.group(1)] = match.group(2)
+    return mapping
+
+
+def parse_tileset_attr_symbols(path):
+    tileset_re = re.compile(r"const\s+struct\s+Tileset\s+(gTileset_[A-Za-z0-9_]+)\s*=")
+    attr_re = re.compile(r"\.metatileAttributes\s*=\s*(gMetatileAttributes_[A-Za-z0-9_]+)")
+    mapping = {}
+    tileset_name = None
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            match = tileset_re.match(line)
+            if match:
+                tileset_name = match.group(1)
+                continue
+            if tileset_name:
+                attr_match = attr_re.search(line)
+                if attr_match:
+                    mapping[tileset_name] = attr_match.group(1)
+                if line.strip().startswith("};"):
+                    tileset_name = None
+    return mapping
+
+
+def parse_tileset_fields(path):
+    # gTileset_* -> {field: symbol} for every ".field = gSymbol" in the header.
+    tileset_re = re.compile(r"const\s+struct\s+Tileset\s+(gTileset_[A-Za-z0-9_]+)\s*=")
+    field_re = re.compile(r"\.([A-Za-z]+)\s*=\s*(g[A-Za-z0-9_]+)")
+    mapping = {}
+    tileset_name = None
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            match = tileset_re.match(line)
+            if match:
+                tileset_name = match.group(1)
+                mapping[tileset_name] = {}
+                continue
+            if tileset_name:
+                field_match = field_re.search(line)
+                if field_match:
+                    mapping[tileset_name][field_match.group(1)] = field_match.group(2)
+                if line.strip().startswith("};"):
+                    tileset_name = None
+    return mapping
+
+
+def parse_incbin_paths(path):
+    # Symbol -> list of INCBIN paths, for both single INCBINs and arrays of
+    # them (palettes) that span several lines.
+    symbol_re = re.compile(r"const\s+u\d+\s+(g[A-Za-z0-9_]+)\s*(?:\[[^\]]*\])+\s*=")
+    incbin_re = re.compile(r'INCBIN_U\d+\("([^"]+)"\)')
+    mapping = {}
+    symbol = None
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            match = symbol_re.search(line)
+            if match:
+                symbol = match.group(1)
+                mapping[symbol] = []
+            if symbol:
+                mapping[symbol].extend(incbin_re.findall(line))
+                if ";" in line:
+                    symbol = None
+    return mapping
+
+
+def parse_layouts(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        layouts_data = json.load(handle)
+    return {
+        entry.get("id"): entry
+        for entry in (layouts_data.get("layouts") or [])
+        if isinstance(entry, dict) and entry.get("id")
+    }
+
+
+# Section name -> (source file, parser). Each section is reparsed only when its
+# file's stat signature changes.
+SECTIONS = {
+    "behaviors": (BEHAVIORS_PATH, parse_behavior_constants),
+    "attr_paths": (METATILES_PATH, parse_metatile_attr_paths),
+    "tileset_attrs": (TILESETS_HEADERS_PATH, parse_tileset_attr_symbols),
+    "layout_by_id": (LAYOUTS_PATH, parse_layouts),
+    "tileset_fields": (TILESETS_HEADERS_PATH, parse_tileset_fields),
+    "graphics_paths": (GRAPHICS_PATH, parse_incbin_paths),
+    "core_graphics_paths": (CORE_GRAPHICS_PATH, parse_incbin_paths),
+    "metatile_paths": (METATILES_PATH, parse_incbin_paths),
+}
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_cache(version):
+    if not os.path.isfile(CACHE_PATH):
+        return None
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def save_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="ascii", newline="\n") as handle:
+        json.dump(cache, handle, ensure_ascii=True, separators=(",", ":"))
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def read_section(path, parser, cached):
+    signature = file_signature(path)
+    if cached and cached.get("signature") == signature:
+        return cached, False
+    if signature is None:
+        return {"signature": None, "hash": None, "value": {}}, True
+    return {
+        "signature": signature,
+        "hash": build_manifest.hash_file(path),
+        "value": parser(path),
+    }, True
+
+
+def source_map_path(entry):
+    return os.path.join(SOURCE_DIR, entry, "map.json")
+
+
+def read_source_map(entry, cached):
+    map_path = source_map_path(entry)
+    signature = file_signature(map_path)
+    if signature is None:
+        return None, False
+    if cached and cached.get("signature") == signature:
+        return cached, False
+    try:
+        with open(map_path, "rb") as handle:
+            raw = handle.read()
+        data = json.loads(raw.decode("utf-8"))
+    except Exception as exc:
+        print("Failed to read source map:", entry, exc)
+        return None, False
+    return {"signature": signature, "hash": build_manifest.hash_bytes(raw), "data": data}, True
+
+
+def load_index(stats=None):
+    # Symbol database for the pokefirered sources. Parsed results are kept in
+    # tools/.cache keyed by each source file's mtime and size, so a warm run
+    # only stats files; a change to this module discards the whole cache.
+    # Parse times and cache hits are added to stats when given.
+    stages = stats["stages"] if stats else {}
+    counts = stats["counts"] if stats else {}
+    version = build_manifest.combine_hashes(
+        [str(INDEX_VERSION), build_manifest.hash_file(__file__)]
+    )
+    cache = load_cache(version) or {"version": version, "sections": {}, "maps": {}}
+    dirty = False
+
+    sections = {}
+    for name, (path, parser) in SECTIONS.items():
+        with build_stats.stage(stages, "index_parse_" + name):
+            section, changed = read_section(path, parser, cache["sections"].get(name))
+        sections[name] = section
+        build_stats.add_count(
+            counts, "index_sections_parsed" if changed else "index_sections_cached"
+        )
+        dirty = dirty or changed
+
+    maps = {}
+    with build_stats.stage(stages, "index_source_maps"):
+        entries = sorted(os.listdir(SOURCE_DIR)) if os.path.isdir(SOURCE_DIR) else []
+        for entry in entries:
+            source, changed = read_source_map(entry, cache["maps"].get(entry))
+            if source:
+                maps[entry] = source
+                build_stats.add_count(
+                    counts, "source_maps_parsed" if changed else "source_maps_cached"
+                )
+            dirty = dirty or changed
+    dirty = dirty or len(maps) != len(cache["maps"])
+
+    if dirty:
+        with build_stats.stage(stages, "index_cache_save"):
+            save_cache({"version": version, "sections": sections, "maps": maps})
+
+    db = {name: section["value"] for name, section in sections.items()}
+    db["file_hashes"] = {name: section["hash"] for name, section in sections.items()}
+    db["source_by_id"] = {entry: source["data"] for entry, source in maps.items()}
+    db["source_hash_by_id"] = {entry: source["hash"] for entry, source in maps.items()}
+    db["map_const_to_id"] = {}
+    db["map_id_to_const"] = {}
+    for entry, source in maps.items():
+        map_const = source["data"].get("id")
+        if map_const:
+            db["map_const_to_id"][map_const] = entry
+            db["map_id_to_const"][entry] = map_const
+    return db
+
+
+def resolve_attr_path(tileset_name, tileset_attrs, attr_paths):
+    if not tileset_name:
+        return None
+    attr_symbol = tileset_attrs.get(tileset_name)
+    if not attr_symbol:
+        return None
+    rel_path = attr_paths.get(attr_symbol)
+    if not rel_path:
+        return None
+    return os.path.join(PFR_ROOT, rel_path.replace("/", os.sep))
+
+
+def resolve_tileset_graphics(tileset_name, db):
+    # Source files a tileset renders from: tiles.png, its JASC palettes and
+    # metatiles.bin, or None when any of them cannot be resolved.
+    fields = db["tileset_fields"].get(tileset_name) or {}
+
+    def graphics(symbol):
+        return db["graphics_paths"].get(symbol) or db["core_graphics_paths"].get(symbol) or []
+
+    tiles = graphics(fields.get("tiles"))
+    palettes = graphics(fields.get("palettes"))
+    metatiles = db["metatile_paths"].get(fields.get("metatiles")) or []
+    if len(tiles) != 1 or not palettes or len(metatiles) != 1:
+        return None
+
+    def source_path(rel_path):
+        return os.path.join(PFR_ROOT, rel_path.replace("/", os.sep))
+
+    return {
+        "tiles": source_path(re.sub(r"\.4bpp(\.lz)?$", ".png", tiles[0])),
+        "palettes": [source_path(re.sub(r"\.gbapal$", ".pal", rel)) for rel in palettes],
+        "metatiles": source_path(metatiles[0]),
+    }
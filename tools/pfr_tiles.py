@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+PRIMARY_METATILES = 640
+TILE_INDEX_MASK = 0x03FF
+BEHAVIOR_MASK = 0x01FF
+
+# Value stored in behavior grids for empty blocks (tile id 0x3FF) and tile ids
+# that fall outside their tileset's attribute table.
+NO_BEHAVIOR = BEHAVIOR_MASK + 1
+
+
+def load_attrs(path, cache):
+    if not path:
+        return None
+    if path in cache:
+        return cache[path]
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as handle:
+        data = handle.read()
+    count = len(data) // 4
+    attrs = np.frombuffer(data, dtype="<u4", count=count)
+    cache[path] = attrs
+    return attrs
+
+
+def load_blocks(path, width, height):
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as handle:
+        data = handle.read()
+    expected = width * height * 2
+    if len(data) < expected:
+        return None
+    return np.frombuffer(data, dtype="<u2", count=width * height).reshape(height, width)
+
+
+def merge_attrs(primary_attrs, secondary_attrs):
+    # One behavior per tile id: primary metatiles fill 0..639, secondary ones
+    # start at 640, and the empty-block id 0x3FF never resolves.
+    table = np.full(TILE_INDEX_MASK + 1, NO_BEHAVIOR, dtype=np.uint16)
+    primary_count = min(len(primary_attrs), PRIMARY_METATILES)
+    table[:primary_count] = primary_attrs[:primary_count] & BEHAVIOR_MASK
+    secondary_count = min(len(secondary_attrs), TILE_INDEX_MASK - PRIMARY_METATILES)
+    table[PRIMARY_METATILES : PRIMARY_METATILES + secondary_count] = (
+        secondary_attrs[:secondary_count] & BEHAVIOR_MASK
+    )
+    return table
+
+
+def classify_layout(blocks, attrs):
+    return attrs[blocks & TILE_INDEX_MASK]
+
+
+def behavior_lookup(values_by_behavior, dtype=np.uint8):
+    lookup = np.zeros(NO_BEHAVIOR + 1, dtype=dtype)
+    for behavior, value in values_by_behavior.items():
+        if 0 <= behavior < NO_BEHAVIOR:
+            lookup[behavior] = value
+    return lookup
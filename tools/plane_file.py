@@ -0,0 +1,44 @@
+import struct
+
+import numpy as np
+
+# Per-map plane files (.grid, .nav), little-endian:
+#   header  4-byte magic, u16 version, u16 width, u16 height, u16 plane count
+#   planes  width*height cells each, row-major, in the caller's plane order
+# Callers list u16 planes before u8 ones so every plane starts on an aligned
+# offset and can be viewed in place (np.memmap, Uint16Array/Uint8Array over
+# the buffer).
+HEADER = struct.Struct("<4sHHHH")
+
+
+def encode(magic, version, planes, arrays):
+    # planes: [(name, dtype)]; arrays: name -> (height, width) array.
+    height, width = arrays[planes[0][0]].shape
+    chunks = [HEADER.pack(magic, version, width, height, len(planes))]
+    for name, dtype in planes:
+        chunks.append(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+    return b"".join(chunks)
+
+
+def read_header(path, magic, version):
+    # (width, height, plane count), for files whose plane list varies.
+    with open(path, "rb") as handle:
+        found, found_version, width, height, plane_count = HEADER.unpack(
+            handle.read(HEADER.size)
+        )
+    if found != magic or found_version != version:
+        raise ValueError("Unsupported %s file: %s" % (magic.decode("ascii"), path))
+    return width, height, plane_count
+
+
+def read(path, magic, version, planes):
+    # Maps the file read-only; each plane is a (height, width) view into it.
+    width, height, plane_count = read_header(path, magic, version)
+    if plane_count != len(planes):
+        raise ValueError("Unsupported %s file: %s" % (magic.decode("ascii"), path))
+    arrays = {"width": width, "height": height}
+    offset = HEADER.size
+    for name, dtype in planes:
+        arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(height, width))
+        offset += width * height * np.dtype(dtype).itemsize
+    return arrays
@@ -0,0 +1,146 @@
+import itertools
+import json
+import os
+
+import build_manifest
+
+REPORT_PATH = os.path.join(build_manifest.CACHE_DIR, "portal-locks-report.json")
+
+LOCK_KINDS = ("warp", "connection")
+DIRECTIONS = ("up", "down", "left", "right")
+
+# A rule matches on the fields it sets; missing or empty fields are wildcards.
+# Precedence is explicit instead of file order: rules setting more fields win,
+# and between rules setting as many, the one whose set fields come first in
+# KEY_FIELDS wins (fromMap, then toMap, direction, kind). File order only
+# decides between rules with the same key, where the first one wins.
+KEY_FIELDS = ("fromMap", "toMap", "direction", "kind")
+PATTERNS = sorted(
+    itertools.product((True, False), repeat=len(KEY_FIELDS)),
+    key=lambda mask: (-sum(mask), [not concrete for concrete in mask]),
+)
+
+
+def rule_key(rule):
+    return tuple(rule.get(field) or None for field in KEY_FIELDS)
+
+
+def rule_pattern(key):
+    return tuple(value is not None for value in key)
+
+
+def compile_locks(rules):
+    # {"rules": key -> (position, rule), "patterns": masks in use, in
+    # precedence order}. Matching does one dict lookup per pattern in use,
+    # at most 16, however many rules there are.
+    by_key = {}
+    for position, rule in enumerate(rules):
+        by_key.setdefault(rule_key(rule), (position, rule))
+    used = {rule_pattern(key) for key in by_key}
+    return {"rules": by_key, "patterns": [mask for mask in PATTERNS if mask in used]}
+
+
+def query_keys(compiled, kind, from_map, to_map, direction):
+    # Lookup keys for the portal, highest precedence first. Masks setting a
+    # field the portal leaves empty (direction on warps) are skipped: they
+    # would build the same key as the mask without that field and let a
+    # rule match with more precedence than the fields it actually sets.
+    values = (from_map, to_map, direction, kind)
+    for mask in compiled["patterns"]:
+        if any(concrete and value is None for value, concrete in zip(values, mask)):
+            continue
+        yield tuple(value if concrete else None for value, concrete in zip(values, mask))
+
+
+def candidates(compiled, kind, from_map, to_map, direction):
+    # Every (position, rule) matching the portal, highest precedence first.
+    found = []
+    for key in query_keys(compiled, kind, from_map, to_map, direction):
+        hit = compiled["rules"].get(key)
+        if hit:
+            found.append(hit)
+    return found
+
+
+def match_lock(compiled, kind, from_map, to_map, direction):
+    for key in query_keys(compiled, kind, from_map, to_map, direction):
+        hit = compiled["rules"].get(key)
+        if hit:
+            return hit[1]
+    return None
+
+
+def rules_by_from_map(rules):
+    # fromMap -> rules naming it; rules without fromMap are under None.
+    by_from = {}
+    for rule in rules:
+        by_from.setdefault(rule.get("fromMap") or None, []).append(rule)
+    return by_from
+
+
+def portal_queries(maps):
+    # (kind, fromMap, toMap, direction) for each portal event in the world.
+    queries = []
+    for map_id, data in maps:
+        for event in data.get("events") or []:
+            meta = event.get("meta") if isinstance(event, dict) else None
+            target = event.get("target") if isinstance(event, dict) else None
+            if not isinstance(meta, dict) or not isinstance(target, dict):
+                continue
+            if meta.get("source") == "warp":
+                queries.append(("warp", map_id, target.get("mapId"), None))
+            elif meta.get("source") == "connection":
+                queries.append(("connection", map_id, target.get("mapId"), meta.get("direction")))
+    return queries
+
+
+def validate_locks(rules, compiled, map_ids, queries):
+    # One {"rule", "issue"} entry per problem: rules that are malformed, can
+    # never match, or lose every portal they match to a higher rule.
+    issues = []
+
+    def report(position, issue):
+        issues.append({"rule": position, "issue": issue})
+
+    for position, rule in enumerate(rules):
+        kind = rule.get("kind")
+        direction = rule.get("direction")
+        if kind and kind not in LOCK_KINDS:
+            report(position, "unknown kind %r" % kind)
+        if direction and direction not in DIRECTIONS:
+            report(position, "unknown direction %r" % direction)
+        if direction and kind == "warp":
+            report(position, "warps have no direction, the rule never matches")
+        for field in ("fromMap", "toMap"):
+            if rule.get(field) and rule[field] not in map_ids:
+                report(position, "unknown %s %r" % (field, rule[field]))
+        if not rule.get("flag"):
+            report(position, "no flag, the rule locks nothing")
+        first = compiled["rules"][rule_key(rule)][0]
+        if first != position:
+            report(position, "shadowed by rule %d with the same key" % first)
+
+    matched = {}
+    won = set()
+    for query in queries:
+        found = candidates(compiled, *query)
+        if found:
+            won.add(found[0][0])
+        for position, _ in found:
+            matched.setdefault(position, set()).add(found[0][0])
+    for position, _ in sorted(compiled["rules"].values(), key=lambda hit: hit[0]):
+        if position in won:
+            continue
+        if position not in matched:
+            report(position, "matches no portal")
+        else:
+            winners = ", ".join(str(winner) for winner in sorted(matched[position]))
+            report(position, "overridden on every portal it matches by rule(s) %s" % winners)
+    issues.sort(key=lambda item: item["rule"])
+    return issues
+
+
+def write_report(rules, issues):
+    report = {"rules": len(rules), "issues": issues}
+    payload = json.dumps(report, ensure_ascii=True, indent=1) + "\n"
+    return build_manifest.write_if_changed(REPORT_PATH, payload.encode("ascii"))
@@ -0,0 +1,16 @@
+import sys
+
+import world_compiler
+
+
+def main(argv=None):
+    return world_compiler.main(
+        "render-maps",
+        "Render map images from pokefirered layouts and tileset graphics.",
+        ["render"],
+        argv,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import sys
+
+import world_compiler
+
+
+def main(argv=None):
+    return world_compiler.main(
+        "sync-colliders",
+        "Rebuild map colliders from pokefirered blockdata and metatile behaviors.",
+        ["colliders"],
+        argv,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
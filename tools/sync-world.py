@@ -0,0 +1,13 @@
+import sys
+
+import world_compiler
+
+
+def main(argv=None):
+    return world_compiler.main(
+        "sync-world", "Compile core/mapas from pokefirered in a single pass.", None, argv
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import json
+import math
+import os
+
+import numpy as np
+
+import pass_colliders
+import pass_jumps
+import pfr_tiles
+
+# Generates a world tree with the layout the sync tools expect under
+# WORLD_ROOT: core/mapas/*.json, the pokefirered sources they read
+# (map.json, layouts, tileset headers, attribute and block binaries,
+# metatile_behaviors.h) and data/portal-locks.json. Maps sit on a square grid
+# so edge connections always have a real neighbour.
+
+PFR_REL = os.path.join("core", "pokefirered-master", "pokefirered-master")
+PRIMARY_TILESET = "gTileset_SynthPrimary"
+SECONDARY_TILESETS = 8
+CONNECTION_DIRS = [("up", 0, -1), ("down", 0, 1), ("left", -1, 0), ("right", 1, 0)]
+
+# Metatile ids make_blocks paints with; grass is the first secondary metatile.
+METATILE_GROUND = 1
+METATILE_TREE = 2
+METATILE_WATER = 3
+METATILE_LEDGE = 4
+METATILE_GRASS = pfr_tiles.PRIMARY_METATILES
+COLLISION_SHIFT = 10
+ELEVATION_SHIFT = 12
+
+
+def behavior_names():
+    return (
+        ["MB_NORMAL", "MB_TALL_GRASS"]
+        + pass_colliders.BLOCKED_BEHAVIOR_NAMES
+        + sorted(pass_jumps.JUMP_NAME_TO_DIR)
+    )
+
+
+def parse_range(text):
+    # "24" or "16-64"
+    low, _, high = str(text).partition("-")
+    return int(low), int(high or low)
+
+
+def map_name(idx):
+    return "SynthMap%05d" % idx
+
+
+def map_const(idx):
+    return "MAP_SYNTH_MAP_%05d" % idx
+
+
+def layout_const(idx):
+    return "LAYOUT_SYNTH_MAP_%05d" % idx
+
+
+def write_text(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as handle:
+        handle.write(text)
+
+
+def write_json(path, data):
+    write_text(path, json.dumps(data, indent=2) + "\n")
+
+
+def write_binary(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(payload)
+
+
+def write_headers(pfr_root, behavior_values):
+    lines = ["#ifndef GUARD_METATILE_BEHAVIORS_H", "#define GUARD_METATILE_BEHAVIORS_H", ""]
+    lines += ["#define %s 0x%02X" % (name, value) for name, value in behavior_values.items()]
+    lines += ["", "#endif // GUARD_METATILE_BEHAVIORS_H", ""]
+    write_text(
+        os.path.join(pfr_root, "include", "constants", "metatile_behaviors.h"), "\n".join(lines)
+    )
+
+    tilesets = [("primary", PRIMARY_TILESET)] + [
+        ("secondary", "gTileset_SynthSecondary%d" % idx) for idx in range(SECONDARY_TILESETS)
+    ]
+    headers = []
+    metatiles = []
+    for kind, name in tilesets:
+        symbol = name.replace("gTileset_", "gMetatileAttributes_")
+        rel_path = "data/tilesets/%s/%s/metatile_attributes.bin" % (kind, name[9:].lower())
+        headers += [
+            "const struct Tileset %s =" % name,
+            "{",
+            "    .isCompressed = TRUE,",
+            "    .isSecondary = %s," % ("TRUE" if kind == "secondary" else "FALSE"),
+            "    .metatileAttributes = %s," % symbol,
+            "};",
+            "",
+        ]
+        metatiles.append('const u32 %s[] = INCBIN_U32("%s");' % (symbol, rel_path))
+        if kind == "primary":
+            attrs = np.full(pfr_tiles.PRIMARY_METATILES, behavior_values["MB_NORMAL"], "<u4")
+            attrs[METATILE_WATER] = behavior_values["MB_POND_WATER"]
+            attrs[METATILE_LEDGE] = behavior_values["MB_JUMP_SOUTH"]
+        else:
+            count = pfr_tiles.TILE_INDEX_MASK - pfr_tiles.PRIMARY_METATILES
+            attrs = np.full(count, behavior_values["MB_TALL_GRASS"], "<u4")
+        write_binary(os.path.join(pfr_root, rel_path.replace("/", os.sep)), attrs.tobytes())
+    src_tilesets = os.path.join(pfr_root, "src", "data", "tilesets")
+    write_text(os.path.join(src_tilesets, "headers.h"), "\n".join(headers))
+    write_text(os.path.join(src_tilesets, "metatiles.h"), "\n".join(metatiles) + "\n")
+
+
+def make_blocks(rng, width, height):
+    # Open ground with rectangular tree/water obstacles, tall grass patches and
+    # a few south-facing ledge rows, roughly like a FireRed route.
+    ground = METATILE_GROUND | (3 << ELEVATION_SHIFT)
+    blocks = np.full((height, width), ground, dtype="<u2")
+    cells = width * height
+    for _ in range(max(1, cells // 48)):
+        w = int(rng.integers(1, 6))
+        h = int(rng.integers(1, 6))
+        x = int(rng.integers(0, max(1, width - w)))
+        y = int(rng.integers(0, max(1, height - h)))
+        kind = int(rng.integers(0, 3))
+        if kind == 0:
+            value = METATILE_TREE | (1 << COLLISION_SHIFT) | (3 << ELEVATION_SHIFT)
+        elif kind == 1:
+            value = METATILE_WATER | (1 << ELEVATION_SHIFT)
+        else:
+            value = METATILE_GRASS | (3 << ELEVATION_SHIFT)
+        blocks[y : y + h, x : x + w] = value
+    for _ in range(max(1, height // 12)):
+        y = int(rng.integers(1, max(2, height - 1)))
+        x0 = int(rng.integers(0, max(1, width // 2)))
+        x1 = min(width, x0 + int(rng.integers(2, max(3, width // 2))))
+        blocks[y, x0:x1] = METATILE_LEDGE | (3 << ELEVATION_SHIFT)
+    return blocks
+
+
+def generate_world(
+    root,
+    maps=100,
+    width="16-48",
+    height="16-48",
+    warps=4,
+    connections=2,
+    locks=0,
+    seed=1,
+):
+    rng = np.random.default_rng(seed)
+    pfr_root = os.path.join(root, PFR_REL)
+    maps_dir = os.path.join(root, "core", "mapas")
+    os.makedirs(maps_dir, exist_ok=True)
+
+    behavior_values = {name: value for value, name in enumerate(behavior_names())}
+    write_headers(pfr_root, behavior_values)
+
+    min_w, max_w = parse_range(width)
+    min_h, max_h = parse_range(height)
+    columns = max(1, int(math.ceil(math.sqrt(maps))))
+    sizes = [
+        (int(rng.integers(min_w, max_w + 1)), int(rng.integers(min_h, max_h + 1)))
+        for _ in range(maps)
+    ]
+
+    layouts = []
+    for idx in range(maps):
+        name = map_name(idx)
+        map_width, map_height = sizes[idx]
+        secondary = "gTileset_SynthSecondary%d" % (idx % SECONDARY_TILESETS)
+        blockdata_rel = "data/layouts/%s/map.bin" % name
+        write_binary(
+            os.path.join(pfr_root, blockdata_rel.replace("/", os.sep)),
+            make_blocks(rng, map_width, map_height).tobytes(),
+        )
+        layouts.append(
+            {
+                "id": layout_const(idx),
+                "name": "%s_Layout" % name,
+                "width": map_width,
+                "height": map_height,
+                "primary_tileset": PRIMARY_TILESET,
+                "secondary_tileset": secondary,
+                "blockdata_filepath": blockdata_rel,
+            }
+        )
+
+        warp_events = []
+        for _ in range(warps):
+            dest = int(rng.integers(0, maps))
+            warp_events.append(
+                {
+                    "x": int(rng.integers(0, map_width)),
+                    "y": int(rng.integers(0, map_height)),
+                    "elevation": 0,
+                    "dest_map": map_const(dest),
+                    "dest_warp_id": str(int(rng.integers(0, max(1, warps)))),
+                }
+            )
+        links = []
+        col, row = idx % columns, idx // columns
+        for direction, dx, dy in CONNECTION_DIRS[:connections]:
+            neighbor = (row + dy) * columns + (col + dx)
+            if not (0 <= col + dx < columns and 0 <= row + dy) or neighbor >= maps:
+                continue
+            links.append({"map": map_const(neighbor), "offset": 0, "direction": direction})
+
+        write_json(
+            os.path.join(pfr_root, "data", "maps", name, "map.json"),
+            {
+                "id": map_const(idx),
+                "name": name,
+                "layout": layout_const(idx),
+                "connections": links,
+                "warp_events": warp_events,
+                "object_events": [],
+                "coord_events": [],
+                "bg_events": [],
+            },
+        )
+        write_json(
+            os.path.join(maps_dir, "%s.json" % name),
+            {
+                "id": name,
+                "name": name,
+                "image": "mapa.png",
+                "tileSize": 16,
+                "meta": {
+                    "layoutId": layout_const(idx),
+                    "sourceMapId": map_const(idx),
+                    "width": map_width,
+                    "height": map_height,
+                    "primaryTileset": PRIMARY_TILESET,
+                    "secondaryTileset": secondary,
+                },
+                "start": {"x": 0, "y": 0},
+                "colliders": [],
+                "npcs": [],
+                "events": [],
+                "dialogs": [],
+                "jumps": [],
+            },
+        )
+
+    write_json(
+        os.path.join(pfr_root, "data", "layouts", "layouts.json"),
+        {"layouts_table_label": "gMapLayouts", "layouts": layouts},
+    )
+
+    rules = []
+    for idx in range(locks):
+        kind = "connection" if rng.integers(0, 4) == 0 else "warp"
+        rule = {
+            "kind": kind,
+            "fromMap": map_name(int(rng.integers(0, maps))),
+            "flag": "FLAG_SYNTH_LOCK_%d" % idx,
+            "message": "Locked.",
+        }
+        if rng.integers(0, 2):
+            rule["toMap"] = map_name(int(rng.integers(0, maps)))
+        rules.append(rule)
+    write_json(os.path.join(root, "data", "portal-locks.json"), rules)
+    return {
+        "maps": maps,
+        "columns": columns,
+        "cells": sum(w * h for w, h in sizes),
+        "locks": locks,
+    }
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import synth_world
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each tool is run three times against the same world: "cold" with no
+# manifest or symbol cache, "warm" with nothing to do, and "touch" after one
+# source map.json changes, which is the incremental case the manifest targets.
+RUNS = ["cold", "warm", "touch"]
+
+
+def run_tool(root, tool, run, extra_args):
+    stats_path = os.path.join(root, "bench-stats", "%s-%s.json" % (tool, run))
+    command = [sys.executable, os.path.join(TOOLS_DIR, tool + ".py"), "--stats", stats_path]
+    env = dict(os.environ, WORLD_ROOT=root)
+    started = time.perf_counter()
+    completed = subprocess.run(
+        command + extra_args, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    wall = time.perf_counter() - started
+    if completed.returncode != 0 or not os.path.isfile(stats_path):
+        print(completed.stdout.decode("utf-8", "replace"))
+        raise RuntimeError("%s failed during the %s run" % (tool, run))
+    with open(stats_path, "r", encoding="utf-8") as handle:
+        stats = json.load(handle)
+    stats["process_wall"] = wall
+    return stats
+
+
+def touch_source_map(root):
+    # Moves the first warp of the first map one tile, as a level designer would.
+    path = os.path.join(
+        root, synth_world.PFR_REL, "data", "maps", synth_world.map_name(0), "map.json"
+    )
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    if data["warp_events"]:
+        warp = data["warp_events"][0]
+        warp["x"] = warp["x"] - 1 if warp["x"] > 0 else 1
+    else:
+        data["name"] += "_"
+    synth_world.write_json(path, data)
+
+
+def format_report(results):
+    lines = []
+    for tool, runs in results.items():
+        for run, stats in runs.items():
+            rss = stats.get("peak_rss_kb")
+            lines.append(
+                "%-16s %-6s wall %7.2fs  updated %6d  unchanged %6d  peak RSS %s"
+                % (
+                    tool,
+                    run,
+                    stats["process_wall"],
+                    stats["updated"],
+                    stats["unchanged"],
+                    "%.1f MB" % (rss / 1024.0) if rss else "n/a",
+                )
+            )
+            stages = sorted(stats["stages"].items(), key=lambda item: -item[1])
+            for name, seconds in stages:
+                if seconds >= 0.001:
+                    lines.append("    %-22s %8.3fs" % (name, seconds))
+    return "\n".join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the map sync tools against a generated synthetic world."
+    )
+    parser.add_argument("--maps", type=int, default=1000, help="number of maps (default 1000)")
+    parser.add_argument("--width", default="16-48", help="layout width or MIN-MAX range")
+    parser.add_argument("--height", default="16-48", help="layout height or MIN-MAX range")
+    parser.add_argument("--warps", type=int, default=4, help="warps per map")
+    parser.add_argument(
+        "--connections", type=int, default=2, choices=range(5), help="edge connections per map"
+    )
+    parser.add_argument("--locks", type=int, default=50, help="portal lock rules")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--tools",
+        default="sync-world",
+        help="comma separated tools to run (sync-world, sync-portals, sync-jumps, ...)",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="--jobs passed to each tool")
+    parser.add_argument("--out", help="generate the world here and keep it (default: temp dir)")
+    parser.add_argument("--report", metavar="PATH", help="also write the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = os.path.abspath(args.out) if args.out else tempfile.mkdtemp(prefix="synth-world-")
+    if os.path.isdir(os.path.join(root, "core")):
+        print("World dir already exists:", root)
+        return 1
+    try:
+        started = time.perf_counter()
+        world = synth_world.generate_world(
+            root,
+            maps=args.maps,
+            width=args.width,
+            height=args.height,
+            warps=args.warps,
+            connections=args.connections,
+            locks=args.locks,
+            seed=args.seed,
+        )
+        print(
+            "Generated %d maps (%d tiles) in %.2fs at %s"
+            % (world["maps"], world["cells"], time.perf_counter() - started, root)
+        )
+
+        tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+        results = {}
+        for tool in tools:
+            results[tool] = {}
+            for run in RUNS:
+                if run == "touch":
+                    touch_source_map(root)
+                results[tool][run] = run_tool(root, tool, run, ["--jobs", str(args.jobs)])
+        print(format_report(results))
+        if args.report:
+            report = {"world": world, "args": vars(args), "results": results}
+            with open(args.report, "w", encoding="ascii", newline="\n") as handle:
+                json.dump(report, handle, indent=1)
+                handle.write("\n")
+    finally:
+        if not args.out:
+            shutil.rmtree(root, ignore_errors=True)
+    return 0
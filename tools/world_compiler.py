@@ -0,0 +1,712 @@
+import argparse
+import gzip
+import importlib
+import json
+import os
+import sys
+import time
+
+import build_manifest
+import build_stats
+import map_jobs
+import pfr_index
+import pfr_tiles
+import world_pack
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = build_manifest.ROOT
+MAPS_DIR = os.path.join(ROOT, "core", "mapas")
+GRIDS_DIR = os.path.join(MAPS_DIR, "grids")
+TRIGGERS_DIR = os.path.join(MAPS_DIR, "triggers")
+LAYERS_DIR = os.path.join(MAPS_DIR, "layers")
+SEAMS_DIR = os.path.join(MAPS_DIR, "seams")
+NAV_DIR = os.path.join(MAPS_DIR, "nav")
+IMAGES_DIR = os.path.join(MAPS_DIR, "images")
+PFR_ROOT = pfr_index.PFR_ROOT
+SOURCE_DIR = pfr_index.SOURCE_DIR
+LAYOUTS_PATH = pfr_index.LAYOUTS_PATH
+TILESETS_HEADERS_PATH = pfr_index.TILESETS_HEADERS_PATH
+METATILES_PATH = pfr_index.METATILES_PATH
+GRAPHICS_PATH = pfr_index.GRAPHICS_PATH
+CORE_GRAPHICS_PATH = pfr_index.CORE_GRAPHICS_PATH
+BEHAVIORS_PATH = pfr_index.BEHAVIORS_PATH
+
+# Pass name -> module. Each pass module exposes NAME, SUMMARY (label, counter
+# key) pairs, prepare(index), input_parts(index, state, map_id, data) and
+# apply(index, state, map_id, data), which mutates data and returns a dict of
+# counters, or None when the pass cannot handle the map. Passes that only emit
+# sidecar files set WRITES_MAP = False and list them in output_paths(map_id).
+# input_paths(index, state, map_id, data) optionally lists the source files a
+# map's output reads, which --watch uses to rebuild only the affected maps.
+# Passes with world-level output also define finalize(index, state, maps),
+# called once after every map is compiled with (map_id, data) for the whole
+# world as it is on disk.
+PASS_MODULES = {
+    "portals": "pass_portals",
+    "jumps": "pass_jumps",
+    "colliders": "pass_colliders",
+    "grid": "pass_grid",
+    "triggers": "pass_triggers",
+    "layers": "pass_layers",
+    "seams": "pass_seams",
+    "nav": "pass_nav",
+    "render": "pass_render",
+}
+DEFAULT_PASSES = [
+    "portals",
+    "jumps",
+    "colliders",
+    "grid",
+    "triggers",
+    "layers",
+    "seams",
+    "nav",
+]
+
+# Stats of the map compile_map is working on in this process, so helpers the
+# passes call (load_layout_grid) are attributed to that map.
+_map_stats = {"stages": {}, "counts": {}}
+# load_layout_grid results for that map, so every pass shares one blockdata
+# load and classification. Cleared by compile_map after each map.
+_map_grids = {}
+
+OUTPUT_FORMATS = {
+    "pretty": {"indent": 4, "separators": (",", ":  ")},
+    "compact": {"indent": None, "separators": (",", ":")},
+}
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def dump_json(data, output_format="pretty"):
+    return json.dumps(data, ensure_ascii=True, **OUTPUT_FORMATS[output_format])
+
+
+def gzip_bytes(payload):
+    # mtime=0 keeps the output byte-stable across runs.
+    return gzip.compress(payload, 9, mtime=0)
+
+
+def brotli_bytes(payload):
+    return brotli.compress(payload, quality=11)
+
+
+PRECOMPRESSORS = {"gz": gzip_bytes, "br": brotli_bytes}
+
+
+def precompressed_path(map_path, ext):
+    return "%s.%s" % (map_path, ext)
+
+
+def write_precompressed(map_path, payload, exts):
+    # <map>.json.gz / .json.br for the web server to send as-is.
+    for ext in exts:
+        path = precompressed_path(map_path, ext)
+        build_manifest.write_if_changed(path, PRECOMPRESSORS[ext](payload))
+
+
+def remove_precompressed(map_path, keep):
+    # Siblings that were not requested are removed on every run, fresh maps
+    # included, so they never go stale against the map.
+    for ext in PRECOMPRESSORS:
+        path = precompressed_path(map_path, ext)
+        if ext not in keep and os.path.isfile(path):
+            os.remove(path)
+
+
+def to_int(value, default=0):
+    try:
+        return int(value)
+    except Exception:
+        return default
+
+
+def get_pass(name):
+    return importlib.import_module(PASS_MODULES[name])
+
+
+def pass_output_paths(name, map_id):
+    output_paths = getattr(get_pass(name), "output_paths", None)
+    return output_paths(map_id) if output_paths else []
+
+
+def build_attr_tables(layout_by_id, tileset_attrs, attr_paths, counts):
+    attr_cache = {}
+    tables = {}
+    for layout in layout_by_id.values():
+        key = tuple(
+            pfr_index.resolve_attr_path(layout.get(field), tileset_attrs, attr_paths)
+            for field in ("primary_tileset", "secondary_tileset")
+        )
+        if key in tables:
+            build_stats.add_count(counts, "attr_table_hits")
+            continue
+        for path in key:
+            if path:
+                build_stats.add_count(
+                    counts, "attr_cache_hits" if path in attr_cache else "attr_cache_misses"
+                )
+        primary_attrs = pfr_tiles.load_attrs(key[0], attr_cache)
+        secondary_attrs = pfr_tiles.load_attrs(key[1], attr_cache)
+        if primary_attrs is None or secondary_attrs is None:
+            tables[key] = None
+        else:
+            tables[key] = pfr_tiles.merge_attrs(primary_attrs, secondary_attrs)
+    attr_hashes = {path: build_manifest.hash_file(path) for path in attr_cache}
+    return tables, attr_hashes
+
+
+def get_map_size(map_data):
+    if not isinstance(map_data, dict):
+        return None
+    meta = map_data.get("meta") if isinstance(map_data.get("meta"), dict) else {}
+    width = map_data.get("width") or map_data.get("tilesX") or meta.get("width")
+    height = map_data.get("height") or map_data.get("tilesY") or meta.get("height")
+    width = to_int(width, 0)
+    height = to_int(height, 0)
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
+
+
+def build_index(stats=None):
+    stats = stats or build_stats.new_stats()
+    db = pfr_index.load_index(stats)
+    with build_stats.stage(stats["stages"], "index_attr_tables"):
+        attr_tables, attr_hashes = build_attr_tables(
+            db["layout_by_id"], db["tileset_attrs"], db["attr_paths"], stats["counts"]
+        )
+    return {
+        "map_const_to_id": db["map_const_to_id"],
+        "source_by_id": db["source_by_id"],
+        "source_hash_by_id": db["source_hash_by_id"],
+        "layout_by_id": db["layout_by_id"],
+        "attr_paths": db["attr_paths"],
+        "tileset_attrs": db["tileset_attrs"],
+        "behaviors": db["behaviors"],
+        "behaviors_hash": db["file_hashes"]["behaviors"],
+        "tileset_graphics": {
+            name: pfr_index.resolve_tileset_graphics(name, db) for name in db["tileset_fields"]
+        },
+        "attr_tables": attr_tables,
+        "attr_hashes": attr_hashes,
+        "size_by_id": {},
+    }
+
+
+def find_source_id(index, map_id, data):
+    if map_id in index["source_by_id"]:
+        return map_id
+    meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+    return index["map_const_to_id"].get(meta.get("sourceMapId"))
+
+
+def resolve_layout(index, map_id, data):
+    # Everything the tile passes need to decode a map's layout, or None when
+    # the map has no usable pokefirered layout.
+    source_id = find_source_id(index, map_id, data)
+    source = index["source_by_id"].get(source_id) if source_id else None
+    if not source:
+        return None
+    layout_id = source.get("layout") or data.get("meta", {}).get("layoutId")
+    layout = index["layout_by_id"].get(layout_id)
+    if not layout:
+        return None
+    width = int(layout.get("width") or 0)
+    height = int(layout.get("height") or 0)
+    if width <= 0 or height <= 0:
+        return None
+    blockdata_rel = layout.get("blockdata_filepath")
+    return {
+        "source_id": source_id,
+        "layout": layout,
+        "width": width,
+        "height": height,
+        "blockdata_path": os.path.join(
+            PFR_ROOT, str(blockdata_rel or "").replace("/", os.sep)
+        ),
+        "primary_attrs_path": pfr_index.resolve_attr_path(
+            layout.get("primary_tileset"), index["tileset_attrs"], index["attr_paths"]
+        ),
+        "secondary_attrs_path": pfr_index.resolve_attr_path(
+            layout.get("secondary_tileset"), index["tileset_attrs"], index["attr_paths"]
+        ),
+    }
+
+
+def layout_input_parts(index, resolved):
+    if not resolved:
+        return [None]
+    return [
+        index["source_hash_by_id"].get(resolved["source_id"]),
+        build_manifest.hash_value(resolved["layout"]),
+        build_manifest.hash_file(resolved["blockdata_path"]),
+        index["attr_hashes"].get(resolved["primary_attrs_path"]),
+        index["attr_hashes"].get(resolved["secondary_attrs_path"]),
+    ]
+
+
+def layout_input_paths(index, map_id, data):
+    paths = [LAYOUTS_PATH, METATILES_PATH, TILESETS_HEADERS_PATH]
+    source_id = find_source_id(index, map_id, data)
+    if source_id:
+        paths.append(pfr_index.source_map_path(source_id))
+    resolved = resolve_layout(index, map_id, data)
+    if resolved:
+        paths.extend(
+            [
+                resolved["blockdata_path"],
+                resolved["primary_attrs_path"],
+                resolved["secondary_attrs_path"],
+            ]
+        )
+    return paths
+
+
+def layout_sources_present(behaviors=True):
+    # prepare() check for the passes reading layouts (and behaviour values).
+    if not os.path.isfile(LAYOUTS_PATH):
+        print("Missing layouts:", LAYOUTS_PATH)
+        return False
+    if behaviors and not os.path.isfile(BEHAVIORS_PATH):
+        print("Missing behaviors:", BEHAVIORS_PATH)
+        return False
+    return True
+
+
+def behavior_input_parts(index, state, map_id, data):
+    # input_parts for passes built from the layout grid and the behaviour
+    # values; their prepare() state carries "behaviors_hash".
+    resolved = resolve_layout(index, map_id, data)
+    return layout_input_parts(index, resolved) + [state["behaviors_hash"]]
+
+
+def behavior_input_paths(index, state, map_id, data):
+    return layout_input_paths(index, map_id, data) + [BEHAVIORS_PATH]
+
+
+def add_map_count(name, amount=1):
+    # Counts for the map being compiled; they reach --stats, not the summary,
+    # so they may depend on per-process state such as caches.
+    build_stats.add_count(_map_stats["counts"], name, amount)
+
+
+def load_layout_grid(index, resolved):
+    # (blocks, behaviors) for a resolved layout, or None if its blockdata or
+    # attribute tables are missing. Loaded once per map and shared by the
+    # passes, so the arrays are read-only.
+    key = (
+        resolved["blockdata_path"],
+        resolved["width"],
+        resolved["height"],
+        resolved["primary_attrs_path"],
+        resolved["secondary_attrs_path"],
+    )
+    if key not in _map_grids:
+        _map_grids[key] = _load_layout_grid(index, resolved)
+    else:
+        add_map_count("layout_grid_reuses")
+    return _map_grids[key]
+
+
+def _load_layout_grid(index, resolved):
+    with build_stats.stage(_map_stats["stages"], "map_blockdata"):
+        blocks = pfr_tiles.load_blocks(
+            resolved["blockdata_path"], resolved["width"], resolved["height"]
+        )
+    if blocks is None:
+        return None
+    add_map_count("blockdata_loads")
+    attrs = index["attr_tables"].get(
+        (resolved["primary_attrs_path"], resolved["secondary_attrs_path"])
+    )
+    if attrs is None:
+        return None
+    with build_stats.stage(_map_stats["stages"], "map_classify"):
+        behaviors = pfr_tiles.classify_layout(blocks, attrs)
+    blocks.setflags(write=False)
+    behaviors.setflags(write=False)
+    return blocks, behaviors
+
+
+def load_maps():
+    maps = []
+    for file_name in sorted(os.listdir(MAPS_DIR)):
+        if not file_name.endswith(".json") or file_name == "index.json":
+            continue
+        map_path = os.path.join(MAPS_DIR, file_name)
+        try:
+            with open(map_path, "rb") as handle:
+                raw = handle.read()
+            data = json.loads(raw.decode("utf-8"))
+        except Exception as exc:
+            print("Failed to read map:", file_name, exc)
+            continue
+        map_id = data.get("id") or os.path.splitext(file_name)[0]
+        maps.append((map_path, map_id, data, build_manifest.hash_bytes(raw)))
+    return maps
+
+
+def compile_map(context, item):
+    started = time.perf_counter()
+    try:
+        result = _compile_map(context, item)
+    finally:
+        _map_grids.clear()
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _compile_map(context, item):
+    global _map_stats
+    map_path, map_id, data, output_hash = item
+    index = context["index"]
+    result = {
+        "status": None,
+        "map_id": map_id,
+        "counters": {},
+        "entry": None,
+        "stats": {"stages": {}, "counts": {}},
+    }
+    _map_stats = result["stats"]
+    stages = _map_stats["stages"]
+    remove_precompressed(map_path, context["precompress"])
+
+    with build_stats.stage(stages, "map_hash"):
+        parts = [context["format"]]
+        for name, state in context["passes"]:
+            parts.append(name)
+            parts.extend(get_pass(name).input_parts(index, state, map_id, data))
+        inputs_hash = build_manifest.combine_hashes(parts)
+    if not context["force"] and build_manifest.is_fresh(
+        context["manifest"], map_id, inputs_hash, output_hash
+    ):
+        # Passes that skipped the map (no layout for grid/nav, ...) wrote no
+        # sidecar, so only the ones that applied last time are checked.
+        applied = build_manifest.applied_passes(context["manifest"], map_id)
+        sidecars = [path for name in applied for path in pass_output_paths(name, map_id)]
+        sidecars += [precompressed_path(map_path, ext) for ext in context["precompress"]]
+        if all(os.path.isfile(path) for path in sidecars):
+            result["status"] = "unchanged"
+            result["entry"] = (inputs_hash, output_hash, applied)
+            return result
+
+    applied = []
+    writes_map = False
+    for name, state in context["passes"]:
+        with build_stats.stage(stages, "map_pass_" + name):
+            counters = get_pass(name).apply(index, state, map_id, data)
+        if counters is None:
+            counters = {"skipped": 1}
+        else:
+            applied.append(name)
+            writes_map = writes_map or getattr(get_pass(name), "WRITES_MAP", True)
+        for key, value in counters.items():
+            result["counters"][(name, key)] = value
+    if not applied:
+        result["status"] = "skipped"
+        return result
+
+    result["status"] = "updated"
+    if writes_map:
+        with build_stats.stage(stages, "map_serialize"):
+            output = (dump_json(data, context["format"]) + "\n").encode("ascii")
+            new_hash = build_manifest.hash_bytes(output)
+        if new_hash != output_hash:
+            with build_stats.stage(stages, "map_write"):
+                build_manifest.write_atomic(map_path, output)
+            output_hash = new_hash
+    elif context["precompress"]:
+        with open(map_path, "rb") as handle:
+            output = handle.read()
+    if writes_map or context["precompress"]:
+        with build_stats.stage(stages, "map_precompress"):
+            write_precompressed(map_path, output, context["precompress"])
+    result["entry"] = (inputs_hash, output_hash, applied)
+    return result
+
+
+def parse_args(argv, description, pass_names):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild every map, ignoring the build manifest"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="worker processes to use (0 = one per CPU); output matches a serial run",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_FORMATS),
+        default="pretty",
+        help="map JSON layout: indented (pretty) or without whitespace (compact)",
+    )
+    parser.add_argument(
+        "--precompress",
+        default="",
+        help="comma separated precompressed siblings to keep next to each map (%s)"
+        % ", ".join(PRECOMPRESSORS),
+    )
+    parser.add_argument(
+        "--pack",
+        choices=sorted(world_pack.COMPRESSION),
+        help="also write every map into %s with the given blob compression"
+        % os.path.relpath(world_pack.PACK_PATH, ROOT),
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="PATH",
+        help="write stage timings and run metrics to PATH as JSON and print a summary",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=build_stats.SLOWEST_MAPS,
+        metavar="N",
+        help="number of slowest maps listed by --stats (default %d)" % build_stats.SLOWEST_MAPS,
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and recompile the maps affected by each source change",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="seconds between --watch polls (default 0.5)",
+    )
+    if pass_names is None:
+        parser.add_argument(
+            "--passes",
+            default=",".join(DEFAULT_PASSES),
+            help="comma separated passes to run, in order (%s)" % ", ".join(PASS_MODULES),
+        )
+    return parser.parse_args(argv)
+
+
+def tool_sources():
+    # Every tools/ module loaded once the passes are imported, so an edit to
+    # a helper a pass uses (pass_grid -> pass_colliders, portals ->
+    # portal_locks) also invalidates the manifest.
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    return sorted(
+        os.path.abspath(module.__file__)
+        for module in list(sys.modules.values())
+        if getattr(module, "__file__", None)
+        and module.__name__ != "__main__"
+        and os.path.dirname(os.path.abspath(module.__file__)) == tools_dir
+    )
+
+
+def load_world(pass_names, stats):
+    # (index, map_files, passes), or None when a pass cannot start.
+    stages = stats["stages"]
+    with build_stats.stage(stages, "index"):
+        index = build_index(stats)
+    with build_stats.stage(stages, "load_maps"):
+        map_files = load_maps()
+    for _, map_id, data, _ in map_files:
+        size = get_map_size(data)
+        if size:
+            index["size_by_id"][map_id] = size
+
+    passes = []
+    for name in pass_names:
+        with build_stats.stage(stages, "prepare_" + name):
+            state = get_pass(name).prepare(index)
+        if state is None:
+            return None
+        passes.append((name, state))
+    return index, map_files, passes
+
+
+def compile_maps(context, map_files, jobs, manifest, stats, slowest=build_stats.SLOWEST_MAPS):
+    # Compiles map_files, recording their entries in manifest; returns
+    # (updated, unchanged, totals).
+    with build_stats.stage(stats["stages"], "compile"):
+        results = map_jobs.run(compile_map, context, map_files, jobs)
+    updated = 0
+    unchanged = 0
+    totals = {}
+    map_times = []
+    for result in results:
+        if result["entry"]:
+            build_manifest.record(manifest, result["map_id"], *result["entry"])
+        if result["status"] == "updated":
+            updated += 1
+        elif result["status"] == "unchanged":
+            unchanged += 1
+        for key, value in result["counters"].items():
+            totals[key] = totals.get(key, 0) + value
+        build_stats.merge_times(stats["stages"], result["stats"]["stages"])
+        build_stats.merge_counts(stats["counts"], result["stats"]["counts"])
+        map_times.append((result["map_id"], result["seconds"], result["status"]))
+    stats["slowest_maps"] = build_stats.slowest(map_times, slowest)
+    return updated, unchanged, totals
+
+
+def finish_world(args, index, passes):
+    finalizers = [
+        (get_pass(name).finalize, state)
+        for name, state in passes
+        if hasattr(get_pass(name), "finalize")
+    ]
+    if args.pack or finalizers:
+        # Read back from disk so maps rebuilt in worker processes are included.
+        world_maps = [(map_id, data) for _, map_id, data, _ in load_maps()]
+    for finalize, state in finalizers:
+        finalize(index, state, world_maps)
+    if args.pack:
+        packed = world_pack.write_pack(world_pack.PACK_PATH, world_maps, args.pack)
+        print("World pack:", world_pack.PACK_PATH, "written" if packed else "unchanged")
+
+
+def print_summary(pass_names, updated, unchanged, totals):
+    summary = ["Updated maps:", updated]
+    for name in pass_names:
+        for label, key in get_pass(name).SUMMARY:
+            summary.extend([label, totals.get((name, key), 0)])
+    summary.extend(["unchanged:", unchanged])
+    print(*summary)
+
+
+def map_dependencies(index, passes, map_files):
+    # Reverse dependency map: source file -> ids of the maps whose output
+    # reads it, collected from each pass's input_paths().
+    deps = {}
+    for _, map_id, data, _ in map_files:
+        for name, state in passes:
+            input_paths = getattr(get_pass(name), "input_paths", None)
+            if not input_paths:
+                continue
+            for path in input_paths(index, state, map_id, data):
+                if path:
+                    deps.setdefault(path, set()).add(map_id)
+    return deps
+
+
+def file_signatures(paths):
+    return {path: pfr_index.file_signature(path) for path in paths}
+
+
+def watch(args, pass_names, context, manifest, tool_name):
+    # Polls every input the passes depend on and recompiles only the maps that
+    # read a changed file. The manifest still decides what is actually stale.
+    deps = map_dependencies(context["index"], context["passes"], load_maps())
+    signatures = file_signatures(deps)
+    print("Watching %d inputs (Ctrl+C to stop)" % len(deps))
+    try:
+        while True:
+            time.sleep(args.interval)
+            current = file_signatures(deps)
+            changed = sorted(path for path in deps if current[path] != signatures[path])
+            if not changed:
+                continue
+            affected = set()
+            for path in changed:
+                affected.update(deps[path])
+            for path in changed:
+                print("Changed:", os.path.relpath(path, ROOT))
+
+            world = load_world(pass_names, build_stats.new_stats())
+            if world is None:
+                signatures = current
+                continue
+            index, map_files, passes = world
+            context = dict(context, force=False, index=index, passes=passes, manifest=manifest)
+            items = [item for item in map_files if item[1] in affected]
+            started = time.time()
+            updated, unchanged, totals = compile_maps(
+                context, items, map_jobs.resolve_jobs(args.jobs), manifest, build_stats.new_stats()
+            )
+            build_manifest.save_manifest(tool_name, manifest)
+            finish_world(args, index, passes)
+            print_summary(pass_names, updated, unchanged, totals)
+            print("Rebuilt %d affected maps in %.2fs" % (len(items), time.time() - started))
+
+            deps = map_dependencies(index, passes, map_files)
+            signatures = file_signatures(deps)
+    except KeyboardInterrupt:
+        return 0
+
+
+def main(tool_name, description, pass_names=None, argv=None):
+    args = parse_args(argv, description, pass_names)
+    if pass_names is None:
+        pass_names = [name.strip() for name in args.passes.split(",") if name.strip()]
+    for name in pass_names:
+        if name not in PASS_MODULES:
+            print("Unknown pass:", name)
+            return 1
+    precompress = [ext.strip() for ext in args.precompress.split(",") if ext.strip()]
+    for ext in precompress:
+        if ext not in PRECOMPRESSORS:
+            print("Unknown precompression:", ext)
+            return 1
+    if "br" in precompress and brotli is None:
+        print("Missing brotli module (pip install brotli), needed for --precompress br")
+        return 1
+    if not os.path.isdir(MAPS_DIR):
+        print("Missing maps dir:", MAPS_DIR)
+        return 1
+    if not os.path.isdir(SOURCE_DIR):
+        print("Missing source dir:", SOURCE_DIR)
+        return 1
+
+    started = time.perf_counter()
+    stats = build_stats.new_stats()
+    stages = stats["stages"]
+    world = load_world(pass_names, stats)
+    if world is None:
+        return 1
+    index, map_files, passes = world
+
+    tool_version = build_manifest.tool_version(tool_sources())
+    manifest = build_manifest.load_manifest(tool_name, tool_version)
+    next_manifest = build_manifest.new_manifest(tool_version)
+
+    context = {
+        "force": args.force,
+        "format": args.format,
+        "precompress": precompress,
+        "manifest": manifest,
+        "index": index,
+        "passes": passes,
+    }
+    jobs = map_jobs.resolve_jobs(args.jobs)
+    updated, unchanged, totals = compile_maps(
+        context, map_files, jobs, next_manifest, stats, args.slowest
+    )
+    with build_stats.stage(stages, "manifest"):
+        build_manifest.save_manifest(tool_name, next_manifest)
+    with build_stats.stage(stages, "finish"):
+        finish_world(args, index, passes)
+    print_summary(pass_names, updated, unchanged, totals)
+    if args.stats:
+        stats.update(
+            {
+                "tool": tool_name,
+                "passes": pass_names,
+                "jobs": jobs,
+                "maps": len(map_files),
+                "updated": updated,
+                "unchanged": unchanged,
+                "wall": time.perf_counter() - started,
+                "peak_rss_kb": build_stats.peak_rss_kb(),
+            }
+        )
+        build_stats.write_stats(args.stats, stats)
+        print(build_stats.format_summary(stats))
+    if args.watch:
+        return watch(args, pass_names, context, next_manifest, tool_name)
+    return 0
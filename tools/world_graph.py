@@ -0,0 +1,189 @@
+import json
+import os
+from collections import deque
+
+import build_manifest
+
+ROOT = build_manifest.ROOT
+GRAPH_PATH = os.path.join(ROOT, "core", "mapas", "world", "graph.json")
+
+GRAPH_VERSION = 1
+# Hop/next tables grow with the square of a region's size, so regions larger
+# than this only carry their map list and routes are searched on demand.
+ROUTE_TABLE_MAX_MAPS = 1024
+
+
+def map_edges(map_id, data):
+    edges = []
+    for event in data.get("events") or []:
+        if not isinstance(event, dict) or event.get("type") != "door":
+            continue
+        target = event.get("target") if isinstance(event.get("target"), dict) else {}
+        dest_id = target.get("mapId")
+        if not dest_id:
+            continue
+        meta = event.get("meta") if isinstance(event.get("meta"), dict) else {}
+        edge = {
+            "to": dest_id,
+            "kind": meta.get("source") or "door",
+            "event": event.get("id"),
+            "rect": event.get("rect"),
+            "lockFlag": event.get("lockFlag"),
+        }
+        if "connection" in target:
+            edge["connection"] = target.get("connection")
+        else:
+            edge["target"] = {"x": target.get("x", 0), "y": target.get("y", 0)}
+        edges.append(edge)
+    return edges
+
+
+def find_regions(map_ids, adjacency):
+    # Weakly connected components, numbered in map id order.
+    undirected = {map_id: set() for map_id in map_ids}
+    for map_id in map_ids:
+        for dest_id in adjacency[map_id]:
+            if dest_id in undirected:
+                undirected[map_id].add(dest_id)
+                undirected[dest_id].add(map_id)
+    regions = []
+    seen = set()
+    for map_id in map_ids:
+        if map_id in seen:
+            continue
+        members = []
+        queue = deque([map_id])
+        seen.add(map_id)
+        while queue:
+            current = queue.popleft()
+            members.append(current)
+            for other in sorted(undirected[current]):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        regions.append(sorted(members))
+    return regions
+
+
+def route_tables(members, adjacency):
+    # BFS from every member: hops[i][j] is the warp/connection count from i to
+    # j and next[i][j] the local index of the first map to step into (-1 when
+    # j is unreachable from i).
+    local = {map_id: idx for idx, map_id in enumerate(members)}
+    hops = []
+    next_hop = []
+    for start in members:
+        dist = [-1] * len(members)
+        first = [-1] * len(members)
+        dist[local[start]] = 0
+        first[local[start]] = local[start]
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for dest_id in adjacency[current]:
+                j = local.get(dest_id)
+                if j is None or dist[j] >= 0:
+                    continue
+                dist[j] = dist[local[current]] + 1
+                first[j] = j if current == start else first[local[current]]
+                queue.append(dest_id)
+        hops.append(dist)
+        next_hop.append(first)
+    return hops, next_hop
+
+
+def build_graph(maps):
+    # maps: iterable of (map_id, data) for every map in the world.
+    edges_by_map = {}
+    for map_id, data in maps:
+        edges_by_map[map_id] = map_edges(map_id, data)
+    map_ids = sorted(edges_by_map)
+    adjacency = {}
+    for map_id in map_ids:
+        neighbors = []
+        for edge in edges_by_map[map_id]:
+            if edge["to"] in edges_by_map and edge["to"] not in neighbors:
+                neighbors.append(edge["to"])
+        adjacency[map_id] = neighbors
+
+    regions = []
+    region_of = {}
+    for members in find_regions(map_ids, adjacency):
+        for idx, map_id in enumerate(members):
+            region_of[map_id] = [len(regions), idx]
+        region = {"maps": members}
+        if len(members) <= ROUTE_TABLE_MAX_MAPS:
+            region["hops"], region["next"] = route_tables(members, adjacency)
+        regions.append(region)
+
+    return {
+        "version": GRAPH_VERSION,
+        "edges": {map_id: edges_by_map[map_id] for map_id in map_ids},
+        "regionOf": region_of,
+        "regions": regions,
+    }
+
+
+def write_graph(graph, path=GRAPH_PATH):
+    payload = json.dumps(graph, ensure_ascii=True, separators=(",", ":")) + "\n"
+    return build_manifest.write_if_changed(path, payload.encode("ascii"))
+
+
+def load_graph(path=GRAPH_PATH):
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def search_route(graph, from_map, to_map):
+    # Shortest map path by BFS over the edge lists, for regions without tables.
+    parents = {from_map: None}
+    queue = deque([from_map])
+    while queue:
+        current = queue.popleft()
+        if current == to_map:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = parents[current]
+            return path[::-1]
+        for edge in graph["edges"].get(current, []):
+            if edge["to"] not in parents and edge["to"] in graph["edges"]:
+                parents[edge["to"]] = current
+                queue.append(edge["to"])
+    return None
+
+
+def hop_distance(graph, from_map, to_map):
+    source = graph["regionOf"].get(from_map)
+    target = graph["regionOf"].get(to_map)
+    if not source or not target or source[0] != target[0]:
+        return -1
+    region = graph["regions"][source[0]]
+    if "hops" not in region:
+        path = search_route(graph, from_map, to_map)
+        return len(path) - 1 if path else -1
+    return region["hops"][source[1]][target[1]]
+
+
+def next_hop(graph, from_map, to_map):
+    source = graph["regionOf"].get(from_map)
+    target = graph["regionOf"].get(to_map)
+    if not source or not target or source[0] != target[0]:
+        return None
+    region = graph["regions"][source[0]]
+    if "next" not in region:
+        path = search_route(graph, from_map, to_map)
+        return path[1] if path and len(path) > 1 else (path[0] if path else None)
+    step = region["next"][source[1]][target[1]]
+    if step < 0:
+        return None
+    return region["maps"][step]
+
+
+def route(graph, from_map, to_map):
+    if hop_distance(graph, from_map, to_map) < 0:
+        return None
+    path = [from_map]
+    while path[-1] != to_map:
+        path.append(next_hop(graph, path[-1], to_map))
+    return path
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+import build_manifest
+
+ROOT = build_manifest.ROOT
+PACK_PATH = os.path.join(ROOT, "core", "mapas", "world.pack")
+
+# world.pack, little-endian:
+#   header  magic "PRWP", u16 version, u16 compression, u32 index length
+#   index   compact JSON {"maps": {mapId: [offset, length, sha256]}}
+#   blobs   one per map, compact JSON, zlib-compressed when compression == 1
+# Offsets are relative to the first blob (right after the index); the sha256
+# is of the uncompressed JSON bytes.
+PACK_MAGIC = b"PRWP"
+PACK_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+COMPRESSION = {"none": 0, "zlib": 1}
+
+
+def encode_map(data):
+    return json.dumps(data, ensure_ascii=True, separators=(",", ":")).encode("ascii")
+
+
+def build_pack(maps, compression="zlib"):
+    # maps: iterable of (map_id, data); returns the archive bytes.
+    mode = COMPRESSION[compression]
+    blobs = []
+    entries = {}
+    offset = 0
+    for map_id, data in maps:
+        raw = encode_map(data)
+        blob = zlib.compress(raw, 9) if mode else raw
+        entries[map_id] = [offset, len(blob), hashlib.sha256(raw).hexdigest()]
+        offset += len(blob)
+        blobs.append(blob)
+    index = json.dumps({"maps": entries}, separators=(",", ":")).encode("ascii")
+    return b"".join([HEADER.pack(PACK_MAGIC, PACK_VERSION, mode, len(index)), index] + blobs)
+
+
+def write_pack(path, maps, compression="zlib"):
+    return build_manifest.write_if_changed(path, build_pack(maps, compression))
+
+
+class WorldPack:
+    # Reads only the header and index up front; each load_map() is one seek
+    # and one read, so memory follows the maps actually requested.
+
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.handle = open(path, "rb")
+        magic, version, compression, index_length = HEADER.unpack(
+            self.handle.read(HEADER.size)
+        )
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.handle.close()
+            raise ValueError("Unsupported world pack: %s" % path)
+        self.compression = compression
+        self.entries = json.loads(self.handle.read(index_length).decode("ascii"))["maps"]
+        self.data_offset = HEADER.size + index_length
+
+    def map_ids(self):
+        return sorted(self.entries)
+
+    def read_raw(self, map_id):
+        entry = self.entries.get(map_id)
+        if not entry:
+            return None
+        offset, length, _ = entry
+        self.handle.seek(self.data_offset + offset)
+        blob = self.handle.read(length)
+        return zlib.decompress(blob) if self.compression else blob
+
+    def load_map(self, map_id, verify=False):
+        raw = self.read_raw(map_id)
+        if raw is None:
+            return None
+        if verify and hashlib.sha256(raw).hexdigest() != self.entries[map_id][2]:
+            raise ValueError("Corrupt map in world pack: %s" % map_id)
+        return json.loads(raw.decode("ascii"))
+
+    def close(self):
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_pack = None
+
+
+def load_map(map_id, path=PACK_PATH):
+    global _default_pack
+    if _default_pack is None or _default_pack.path != path:
+        if _default_pack is not None:
+            _default_pack.close()
+        _default_pack = WorldPack(path)
+    return _default_pack.load_map(map_id)